@@ -40,5 +40,25 @@ class DigestRecordLemmaAdmin(admin.ModelAdmin):
         return object_modification_url('gatherer', 'digestrecord', obj.digest_record.id if obj.digest_record else None, str(obj.digest_record))
 
 
+class LemmasIndexingQueueItemAdmin(admin.ModelAdmin):
+    readonly_fields = (
+        'id',
+        'dt',
+    )
+    list_display = (
+        'id',
+        'link_to_digest_record',
+        'dt',
+    )
+
+    autocomplete_fields = (
+        'digest_record',
+    )
+
+    def link_to_digest_record(self, obj):
+        return object_modification_url('gatherer', 'digestrecord', obj.digest_record.id if obj.digest_record else None, str(obj.digest_record))
+
+
 admin.site.register(Lemma, LemmaAdmin)
 admin.site.register(DigestRecordLemma, DigestRecordLemmaAdmin)
+admin.site.register(LemmasIndexingQueueItem, LemmasIndexingQueueItemAdmin)
@@ -0,0 +1,47 @@
+from typing import (
+    Dict,
+    Iterable,
+)
+
+from ds.models import (
+    DigestRecordLemma,
+    Lemma,
+    LemmasIndexingQueueItem,
+)
+
+
+LEMMAS_BATCH_SIZE = 1000
+
+
+def lemmas_ids_by_texts(lemmas_texts: Iterable[str]) -> Dict[str, int]:
+    lemmas_texts = set(lemmas_texts)
+    lemmas_ids = dict(Lemma.objects.filter(text__in=lemmas_texts).values_list('text', 'id'))
+    missing_lemmas_texts = lemmas_texts - lemmas_ids.keys()
+    if missing_lemmas_texts:
+        # Same lemmas could be created concurrently, so ignore conflicts and fetch IDs afterwards
+        Lemma.objects.bulk_create([Lemma(text=lemma_text) for lemma_text in missing_lemmas_texts],
+                                  batch_size=LEMMAS_BATCH_SIZE,
+                                  ignore_conflicts=True)
+        lemmas_ids.update(Lemma.objects.filter(text__in=missing_lemmas_texts).values_list('text', 'id'))
+    return lemmas_ids
+
+
+def save_digest_records_lemmas(lemmas_counts_by_digest_record_id: Dict[int, Dict[str, int]]):
+    lemmas_ids = lemmas_ids_by_texts(lemma_text
+                                     for lemmas_counts in lemmas_counts_by_digest_record_id.values()
+                                     for lemma_text in lemmas_counts)
+    # Already existing digest record lemmas are kept as is
+    DigestRecordLemma.objects.bulk_create([DigestRecordLemma(digest_record_id=digest_record_id,
+                                                             lemma_id=lemmas_ids[lemma_text],
+                                                             count=lemma_count)
+                                           for digest_record_id, lemmas_counts in lemmas_counts_by_digest_record_id.items()
+                                           for lemma_text, lemma_count in lemmas_counts.items()],
+                                          batch_size=LEMMAS_BATCH_SIZE,
+                                          ignore_conflicts=True)
+
+
+def enqueue_digest_records_lemmas_indexing(digest_records_ids: Iterable[int]):
+    LemmasIndexingQueueItem.objects.bulk_create([LemmasIndexingQueueItem(digest_record_id=digest_record_id)
+                                                 for digest_record_id in digest_records_ids],
+                                                batch_size=LEMMAS_BATCH_SIZE,
+                                                ignore_conflicts=True)
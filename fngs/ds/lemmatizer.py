@@ -0,0 +1,56 @@
+import functools
+import re
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+
+import lemminflect
+import nltk
+
+
+LEMMAS_KEYS = ('NOUN', 'VERB', 'AUX', 'ADV', 'ADJ')
+WORD_CHAR_REGEXP = re.compile(r'\w')
+DEFAULT_CACHE_SIZE = 100000
+
+
+class Lemmatizer:
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, stopwords: Iterable[str] = ()):
+        self.stopwords = frozenset(stopword.lower() for stopword in stopwords)
+        # News vocabulary is very repetitive, so most of words lemmas are taken from cache
+        self._word_lemmas = functools.lru_cache(maxsize=cache_size)(self._word_lemmas_uncached)
+
+    @staticmethod
+    def _word_lemmas_uncached(word: str) -> Tuple[str, ...]:
+        if not WORD_CHAR_REGEXP.search(word):
+            # Punctuation
+            return ()
+        word_lemmas = lemminflect.getAllLemmas(word)
+        word_lemmas_plain = []
+        for lk in LEMMAS_KEYS:
+            if lk in word_lemmas:
+                word_lemmas_plain += (l.lower() for l in word_lemmas[lk])
+        if not word_lemmas and WORD_CHAR_REGEXP.match(word):
+            word_lemmas_plain.append(word.lower())
+        return tuple(word_lemmas_plain)
+
+    def lemmatize(self, text: str) -> Dict[str, int]:
+        lemmas_counts = {}
+        for word in nltk.word_tokenize(text):
+            if self.stopwords and word.lower() in self.stopwords:
+                continue
+            for lemma in self._word_lemmas(word):
+                lemmas_counts[lemma] = lemmas_counts.get(lemma, 0) + 1
+        return lemmas_counts
+
+    def lemmatize_many(self, texts: Iterable[str]) -> List[Dict[str, int]]:
+        return [self.lemmatize(text) for text in texts]
+
+    def cache_info(self):
+        return self._word_lemmas.cache_info()
+
+
+lemmatizer = Lemmatizer()
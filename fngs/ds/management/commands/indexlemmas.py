@@ -0,0 +1,190 @@
+import datetime
+import logging
+import math
+import multiprocessing
+import sys
+import time
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
+
+from django.core.management.base import BaseCommand
+from django.db import (
+    connections,
+    transaction,
+)
+
+from gatherer.models import (
+    DigestRecord,
+    Language,
+)
+from ds.models import (
+    DigestRecordLemma,
+    LemmasIndexingQueueItem,
+)
+from ds.lemmas import save_digest_records_lemmas
+from ds.lemmatizer import lemmatizer
+
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_PROCESSES_COUNT = 1
+DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS = 10
+
+
+def _lemmatize_many(texts: List[str]) -> List[Dict[str, int]]:
+    return lemmatizer.lemmatize_many(texts)
+
+
+class Command(BaseCommand):
+
+    help = 'Index lemmas of english digest records descriptions (all not indexed records or records from indexing queue)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-a',
+                            '--all',
+                            action='store_true',
+                            help='re-index all records, by default only records without lemmas are indexed')
+        parser.add_argument('-q',
+                            '--queue',
+                            action='store_true',
+                            help='index records from indexing queue filled while gathering')
+        parser.add_argument('-m',
+                            '--daemon',
+                            action='store_true',
+                            help='keep polling indexing queue, requires `--queue`')
+        parser.add_argument('-t',
+                            '--timeout',
+                            type=int,
+                            default=DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS,
+                            help=f'queue polling timeout in seconds for daemon mode, default - {DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS}')
+        parser.add_argument('-p',
+                            '--processes',
+                            type=int,
+                            default=DEFAULT_PROCESSES_COUNT,
+                            help=f'count of processes extracting lemmas, default - {DEFAULT_PROCESSES_COUNT}')
+        parser.add_argument('-c',
+                            '--chunk-size',
+                            type=int,
+                            default=DEFAULT_CHUNK_SIZE,
+                            help=f'count of records indexed at once, default - {DEFAULT_CHUNK_SIZE}')
+        parser.add_argument('-d',
+                            '--debug',
+                            action='store_true',
+                            help='debug mode')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO if not options['debug'] else logging.DEBUG,
+                            format='[%(asctime)s] %(levelname)s: %(message)s')
+        pool = None
+        try:
+            self._check_options(options)
+            if options['processes'] > 1:
+                # Forked processes must not share database connections with main process
+                connections.close_all()
+                pool = multiprocessing.Pool(options['processes'])
+                logging.info(f'Using {options["processes"]} processes for extracting lemmas')
+            if options['queue']:
+                if options['daemon']:
+                    while True:
+                        if not self._index_queue(options, pool):
+                            logging.debug(f'Sleeping {options["timeout"]} second(s)')
+                            time.sleep(options['timeout'])
+                else:
+                    self._index_queue(options, pool)
+            else:
+                self._index_all(options, pool)
+        except KeyboardInterrupt:
+            logging.info('Interrupted')
+        except Exception as e:
+            logging.error(e)
+            sys.exit(1)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    @staticmethod
+    def _check_options(options):
+        if options['daemon'] and not options['queue']:
+            raise Exception('`--daemon` argument is supported only with `--queue`')
+        if options['queue'] and options['all']:
+            raise Exception('`--queue` and `--all` options are not compatible')
+        if options['processes'] < 1:
+            raise Exception('`--processes` should be positive')
+
+    def _index_all(self, options, pool):
+        begin_dt = datetime.datetime.now()
+        digest_records_queryset = DigestRecord.objects.filter(language=Language.ENGLISH.name,
+                                                              cleared_description__isnull=False)
+        if not options['all']:
+            digest_records_queryset = digest_records_queryset.exclude(digestrecordlemma__isnull=False)
+        digest_records_count = digest_records_queryset.count()
+        logging.info(f'Started indexing lemmas for {digest_records_count} digest record(s)')
+        indexed_count = 0
+        last_printed_percent = None
+        last_id = 0
+        while True:
+            chunk = list(digest_records_queryset.filter(id__gt=last_id)
+                                                .order_by('id')
+                                                .values_list('id', 'cleared_description')[:options['chunk_size']])
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            lemmas_counts_by_digest_record_id = self._extract_lemmas_counts(chunk, pool, options['processes'])
+            with transaction.atomic():
+                if options['all']:
+                    DigestRecordLemma.objects.filter(digest_record_id__in=[digest_record_id for digest_record_id, _ in chunk]).delete()
+                save_digest_records_lemmas(lemmas_counts_by_digest_record_id)
+            indexed_count += len(chunk)
+            percent = math.floor(indexed_count / digest_records_count * 100) if digest_records_count else 100
+            if last_printed_percent is None or percent != last_printed_percent:
+                logging.info(f'Processed {percent}% ({indexed_count} record(s))')
+                last_printed_percent = percent
+        logging.info(f'Finished indexing lemmas, indexed {indexed_count} digest record(s)')
+        logging.debug(f'Lemmatizer cache: {lemmatizer.cache_info()}')
+        logging.info(f'Execution time: {datetime.datetime.now() - begin_dt}')
+
+    def _index_queue(self, options, pool) -> int:
+        indexed_count = 0
+        while True:
+            with transaction.atomic():
+                # Skipping locked items allows running several workers on the same queue
+                queue_items = list(LemmasIndexingQueueItem.objects.select_for_update(skip_locked=True, of=('self',))
+                                                                  .order_by('id')
+                                                                  .values_list('id', 'digest_record_id',
+                                                                               'digest_record__cleared_description')[:options['chunk_size']])
+                if not queue_items:
+                    break
+                chunk = [(digest_record_id, cleared_description)
+                         for _, digest_record_id, cleared_description in queue_items]
+                lemmas_counts_by_digest_record_id = self._extract_lemmas_counts(chunk, pool, options['processes'])
+                # Record could be enqueued again after its description was changed
+                DigestRecordLemma.objects.filter(digest_record_id__in=[digest_record_id for digest_record_id, _ in chunk]).delete()
+                save_digest_records_lemmas(lemmas_counts_by_digest_record_id)
+                LemmasIndexingQueueItem.objects.filter(id__in=[queue_item_id for queue_item_id, _, _ in queue_items]).delete()
+            indexed_count += len(queue_items)
+            logging.info(f'Indexed lemmas for {len(queue_items)} queued digest record(s)')
+        if indexed_count:
+            logging.debug(f'Lemmatizer cache: {lemmatizer.cache_info()}')
+        return indexed_count
+
+    @staticmethod
+    def _extract_lemmas_counts(chunk: List[Tuple[int, str]], pool, pool_processes_count: int) -> Dict[int, Dict[str, int]]:
+        chunk_with_descriptions = [(digest_record_id, cleared_description)
+                                   for digest_record_id, cleared_description in chunk
+                                   if cleared_description]
+        texts = [cleared_description for _, cleared_description in chunk_with_descriptions]
+        if pool is not None:
+            # Workers only extract lemmas, database is accessed from main process only
+            # One subchunk per process, so lemmatizer cache of each process is used as much as possible
+            subchunk_size = math.ceil(len(texts) / pool_processes_count) if texts else 1
+            lemmas_counts = [lemmas_counts_one
+                             for subchunk_lemmas_counts in pool.map(_lemmatize_many,
+                                                                    [texts[i:i + subchunk_size]
+                                                                     for i in range(0, len(texts), subchunk_size)])
+                             for lemmas_counts_one in subchunk_lemmas_counts]
+        else:
+            lemmas_counts = lemmatizer.lemmatize_many(texts)
+        return {digest_record_id: lemmas_counts_one
+                for (digest_record_id, _), lemmas_counts_one in zip(chunk_with_descriptions, lemmas_counts)}
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0090_enable_fetching_for_some_sources'),
+        ('ds', '0006_remove_russian_lemmas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LemmasIndexingQueueItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dt', models.DateTimeField(auto_now_add=True, verbose_name='Date and time of adding to queue')),
+                ('digest_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='gatherer.digestrecord')),
+            ],
+        ),
+    ]
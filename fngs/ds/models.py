@@ -35,3 +35,16 @@ class DigestRecordLemma(models.Model):
             'digest_record',
             'lemma',
         )
+
+
+class LemmasIndexingQueueItem(models.Model):
+
+    digest_record = models.OneToOneField(to=DigestRecord,
+                                         on_delete=models.CASCADE,
+                                         blank=False,
+                                         null=False)
+    dt = models.DateTimeField(verbose_name='Date and time of adding to queue',
+                              auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.digest_record_id}'
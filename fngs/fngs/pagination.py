@@ -1,18 +1,80 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import (
+    F,
+    Q,
+)
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework.status import *
+from rest_framework.utils.urls import replace_query_param
 
 
 class Pagination(PageNumberPagination):
     page_size = 50
     max_page_size = 500
     page_size_query_param = 'page_size'
+    # Views with `cursor_pagination_field` attribute could be paginated by (field, id) keyset with `?pagination=cursor`,
+    # it does not count records and does not use offsets, so all pages are equally cheap
+    pagination_query_param = 'pagination'
+    cursor_pagination_value = 'cursor'
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination_field = getattr(view, 'cursor_pagination_field', None)
+        if self.cursor_pagination_field is None \
+                or request.query_params.get(self.pagination_query_param) != self.cursor_pagination_value:
+            self.cursor_pagination_field = None
+            return super().paginate_queryset(queryset, request, view)
+        return self._paginate_queryset_by_cursor(queryset, request)
+
+    def _paginate_queryset_by_cursor(self, queryset, request):
+        self.request = request
+        field = self.cursor_pagination_field
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(F(field).asc(nulls_last=True), 'id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            field_value, last_id = self._decode_cursor(cursor, queryset.model._meta.get_field(field))
+            if field_value is None:
+                queryset = queryset.filter(**{f'{field}__isnull': True, 'id__gt': last_id})
+            else:
+                queryset = queryset.filter(Q(**{f'{field}__gt': field_value})
+                                           | Q(**{field: field_value, 'id__gt': last_id})
+                                           | Q(**{f'{field}__isnull': True}))
+        # One more record shows if there is next page
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self._encode_cursor(getattr(page[-1], field), page[-1].id)
+        return page
+
+    @staticmethod
+    def _encode_cursor(field_value, last_id):
+        if hasattr(field_value, 'isoformat'):
+            field_value = field_value.isoformat()
+        return base64.urlsafe_b64encode(json.dumps([field_value, last_id]).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor, model_field):
+        # Value is converted by model field, so malformed dates are rejected here instead of failing in database
+        try:
+            field_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return model_field.to_python(field_value), int(last_id)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound('Invalid cursor')
 
     def get_paginated_response(self, data):
         if self.page_size_query_param in self.request.query_params \
                 and int(self.request.query_params[self.page_size_query_param]) > self.max_page_size:
             return Response({'error': f'Requested page size {self.request.query_params[self.page_size_query_param]} is more than max allowed page size {self.max_page_size}'},
                             HTTP_400_BAD_REQUEST)
+        if self.cursor_pagination_field is not None:
+            return self._get_cursor_paginated_response(data)
         return Response({
             'links': {
                 'next': self.get_next_link(),
@@ -25,3 +87,19 @@ class Pagination(PageNumberPagination):
                          else self.page_size,
             'results': data,
         })
+
+    def _get_cursor_paginated_response(self, data):
+        next_link = None
+        if self.next_cursor is not None:
+            next_link = replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+        # Only forward pagination is supported
+        return Response({
+            'links': {
+                'next': next_link,
+                'previous': None,
+            },
+            'page_size': self.request.query_params[self.page_size_query_param] \
+                         if self.page_size_query_param in self.request.query_params \
+                         else self.page_size,
+            'results': data,
+        })
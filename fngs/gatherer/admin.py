@@ -138,6 +138,10 @@ class DigestRecordsSourceAdmin(admin.ModelAdmin):
         'links_to_projects',
         'language',
         'text_fetching_enabled',
+        'etag',
+        'last_modified',
+        'watermark_url',
+        'watermark_dt',
     )
 
     search_fields = (
@@ -182,6 +186,7 @@ class DigestGatheringIterationAdmin(admin.ModelAdmin):
         'source_enabled',
         'source_error',
         'parser_error',
+        'source_unchanged',
     )
 
     autocomplete_fields = (
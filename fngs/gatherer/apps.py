@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class GathererConfig(AppConfig):
     name = 'gatherer'
+
+    def ready(self):
+        import gatherer.keywordsindex  # noqa: F401, connects keywords index invalidation signals
+        import gatherer.keywordsretagging  # noqa: F401, connects keywords retagging queueing signals
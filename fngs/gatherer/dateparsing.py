@@ -0,0 +1,97 @@
+import datetime
+import functools
+import re
+
+import dateutil.parser
+import dateutil.tz
+import pytz
+
+
+DATETIMES_CACHE_SIZE = 4096
+RUSSIAN_TO_ENGLISH_DATE_NAMES = {
+    'Пн': 'Mon',
+    'Вт': 'Tue',
+    'Ср': 'Wed',
+    'Чт': 'Thu',
+    'Пт': 'Fri',
+    'Сб': 'Sat',
+    'Вс': 'Sun',
+    'янв': 'jan',
+    'фев': 'feb',
+    'мар': 'mar',
+    'апр': 'apr',
+    'май': 'may',
+    'мая': 'may',
+    'июн': 'jun',
+    'июл': 'jul',
+    'авг': 'aug',
+    'сен': 'sep',
+    'окт': 'oct',
+    'ноя': 'nov',
+    'дек': 'dec',
+}
+RUSSIAN_DATE_NAMES_REGEXP = re.compile('|'.join(RUSSIAN_TO_ENGLISH_DATE_NAMES))
+MONTHS_NUMBERS = {month: month_i + 1 for month_i, month in enumerate(('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+                                                                      'jul', 'aug', 'sep', 'oct', 'nov', 'dec'))}
+# "Mon, 02 May 2022 10:00:00 +0300", day name is ignored the same way as `dateutil` does
+RFC_822_REGEXP = re.compile(r'(?:[A-Za-z]{3},?\s+)?(\d{1,2})\s+([A-Za-z]{3})\s+(\d{4})\s+(\d{2}):(\d{2})(?::(\d{2}))?'
+                            r'\s+(?:(GMT|UTC|Z)|([+-])(\d{2})(\d{2}))')
+# "2022-05-02T10:00:00.123+03:00"
+ISO_8601_REGEXP = re.compile(r'(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?'
+                             r'(?:(Z)|([+-])(\d{2}):?(\d{2}))')
+
+
+def russian_to_english_date_names(date_str: str) -> str:
+    if date_str.isascii():
+        return date_str
+    return RUSSIAN_DATE_NAMES_REGEXP.sub(lambda match: RUSSIAN_TO_ENGLISH_DATE_NAMES[match.group(0)], date_str)
+
+
+def _timezone(utc: str or None, sign: str or None, hours: str or None, minutes: str or None) -> datetime.tzinfo:
+    if utc:
+        return dateutil.tz.UTC
+    offset_seconds = (int(hours) * 60 + int(minutes)) * 60
+    if not offset_seconds:
+        return dateutil.tz.UTC
+    return dateutil.tz.tzoffset(None, offset_seconds if sign == '+' else -offset_seconds)
+
+
+def _parse_fast(date_str: str) -> datetime.datetime or None:
+    match = RFC_822_REGEXP.fullmatch(date_str)
+    if match is not None:
+        day, month, year, hour, minute, second, utc, sign, offset_hours, offset_minutes = match.groups()
+        month_number = MONTHS_NUMBERS.get(month.lower())
+        if month_number is None:
+            return None
+        return datetime.datetime(int(year), month_number, int(day), int(hour), int(minute), int(second or 0),
+                                 tzinfo=_timezone(utc, sign, offset_hours, offset_minutes))
+    match = ISO_8601_REGEXP.fullmatch(date_str)
+    if match is not None:
+        year, month, day, hour, minute, second, fraction, utc, sign, offset_hours, offset_minutes = match.groups()
+        return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                                 int(fraction.ljust(6, '0')) if fraction else 0,
+                                 tzinfo=_timezone(utc, sign, offset_hours, offset_minutes))
+    return None
+
+
+def is_fast_parseable(date_str: str) -> bool:
+    try:
+        return _parse_fast(russian_to_english_date_names(date_str.strip())) is not None
+    except ValueError:
+        return False
+
+
+@functools.lru_cache(maxsize=DATETIMES_CACHE_SIZE)
+def parse_feed_datetime(date_str: str) -> datetime.datetime:
+    # Feeds are polled repeatedly and keep the same items, so the same strings are parsed again and again
+    date_str = russian_to_english_date_names(date_str.strip())
+    try:
+        dt = _parse_fast(date_str)
+    except ValueError:
+        # Out of range values, `dateutil` reports them the usual way
+        dt = None
+    if dt is None:
+        dt = dateutil.parser.parse(date_str)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=pytz.UTC)
+    return dt
@@ -0,0 +1,31 @@
+import datetime
+from typing import (
+    Dict,
+    List,
+)
+
+from django.db.models import (
+    Case,
+    DateTimeField,
+    Value,
+    When,
+)
+
+from gatherer.models import DigestRecord
+
+
+def backfill_digest_records_dates(dts_by_url: Dict[str, datetime.datetime]) -> List[str]:
+    # Records saved without dates get them when the same posts are found in feeds again,
+    # one query finds such records and one query updates all of them
+    dts_by_url = {url: dt for url, dt in dts_by_url.items() if dt is not None}
+    if not dts_by_url:
+        return []
+    digest_records_ids_urls = list(DigestRecord.objects.filter(url__in=dts_by_url, dt__isnull=True).values_list('id', 'url'))
+    if not digest_records_ids_urls:
+        return []
+    urls = sorted({url for _, url in digest_records_ids_urls})
+    DigestRecord.objects.filter(id__in=[digest_record_id for digest_record_id, _ in digest_records_ids_urls],
+                                dt__isnull=True).update(dt=Case(*[When(url=url, then=Value(dts_by_url[url]))
+                                                                  for url in urls],
+                                                                output_field=DateTimeField()))
+    return urls
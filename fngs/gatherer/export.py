@@ -0,0 +1,90 @@
+import csv
+import datetime
+import json
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+)
+
+from gatherer.models import DigestRecord
+
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+DIGEST_RECORDS_EXPORT_FIELDS = (
+    'id',
+    'dt',
+    'gather_dt',
+    'source__name',
+    'title',
+    'url',
+    'additional_url',
+    'state',
+    'digest_issue__number',
+    'is_main',
+    'content_type',
+    'content_category',
+    'language',
+)
+DIGEST_RECORDS_EXPORT_COLUMNS = tuple(field.replace('__', '_') for field in DIGEST_RECORDS_EXPORT_FIELDS) + (
+    'title_keywords',
+    'projects',
+)
+
+
+def _names_by_digest_record_id(through_model, name_lookup: str, digest_records_ids: List[int]) -> Dict[int, List[str]]:
+    names_by_digest_record_id = {}
+    for digest_record_id, name in through_model.objects.filter(digestrecord_id__in=digest_records_ids) \
+                                                       .order_by('id') \
+                                                       .values_list('digestrecord_id', name_lookup):
+        names_by_digest_record_id.setdefault(digest_record_id, []).append(name)
+    return names_by_digest_record_id
+
+
+def _export_rows_chunk(chunk: List[dict]) -> Iterator[dict]:
+    digest_records_ids = [values['id'] for values in chunk]
+    keywords_names = _names_by_digest_record_id(DigestRecord.title_keywords.through, 'keyword__name', digest_records_ids)
+    projects_names = _names_by_digest_record_id(DigestRecord.projects.through, 'project__name', digest_records_ids)
+    for values in chunk:
+        row = {field.replace('__', '_'): value for field, value in values.items()}
+        row['title_keywords'] = keywords_names.get(values['id'], [])
+        row['projects'] = projects_names.get(values['id'], [])
+        yield row
+
+
+def digest_records_export_rows(queryset, chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    # Records are read with server-side cursor and relations are loaded per chunk, so memory usage does not depend on records count
+    chunk = []
+    for values in queryset.order_by('id').values(*DIGEST_RECORDS_EXPORT_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            yield from _export_rows_chunk(chunk)
+            chunk = []
+    if chunk:
+        yield from _export_rows_chunk(chunk)
+
+
+def _plain_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps({key: _plain_value(value) for key, value in row.items()}, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows: Iterable[dict], columns=DIGEST_RECORDS_EXPORT_COLUMNS) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([','.join(value) if isinstance(value, list) else _plain_value(value)
+                               for value in (row[column] for column in columns)])
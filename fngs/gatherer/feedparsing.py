@@ -0,0 +1,113 @@
+import hashlib
+import re
+import tempfile
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterator,
+)
+
+import requests
+from lxml import etree
+
+
+# Podcasts and video feeds could take several megabytes, anything much bigger is likely broken or not a feed
+DEFAULT_MAX_FEED_SIZE_BYTES = 32 * 1024 * 1024
+FEED_READING_CHUNK_SIZE_BYTES = 64 * 1024
+# Spooled feeds bigger than this are kept in temporary files instead of memory
+MAX_SPOOLED_FEED_MEMORY_SIZE_BYTES = 1024 * 1024
+CHARSET_REGEXP = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class FeedTooLargeException(Exception):
+    pass
+
+
+class FeedReader:
+    # File-like reader of streamed response body for `iterparse`, decompressed body size is limited
+    # and hash of body is calculated on the fly
+
+    def __init__(self, response: requests.Response, max_size: int = DEFAULT_MAX_FEED_SIZE_BYTES):
+        content_length = response.headers.get('Content-Length')
+        # Compressed body is never bigger than decompressed one
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            raise FeedTooLargeException(f'Feed size {content_length} byte(s) is more than {max_size} byte(s)')
+        self.max_size = max_size
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self._chunks = response.iter_content(chunk_size=FEED_READING_CHUNK_SIZE_BYTES)
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._count(chunk)
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _count(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise FeedTooLargeException(f'Feed is bigger than {self.max_size} byte(s)')
+        self.hash.update(chunk)
+
+    def spool(self) -> BinaryIO:
+        # Whole rest of body is read to know its hash before parsing, it is parsed from returned file then
+        spooled_file = tempfile.SpooledTemporaryFile(max_size=MAX_SPOOLED_FEED_MEMORY_SIZE_BYTES)
+        try:
+            spooled_file.write(self._buffer)
+            self._buffer = b''
+            for chunk in self._chunks:
+                self._count(chunk)
+                spooled_file.write(chunk)
+        except Exception:
+            spooled_file.close()
+            raise
+        spooled_file.seek(0)
+        return spooled_file
+
+    def hexdigest(self) -> str:
+        # Not parsed rest of body is read only to finish hash
+        for chunk in self._chunks:
+            self._count(chunk)
+        return self.hash.hexdigest()
+
+
+def response_charset(response: requests.Response) -> str or None:
+    # Only explicitly declared charset overrides XML declaration, `requests` guesses it otherwise
+    match = CHARSET_REGEXP.search(response.headers.get('Content-Type', ''))
+    return match.group(1) if match else None
+
+
+def iterparse_feed_items(reader,
+                         item_tag_name: str,
+                         items_root: Callable[[etree._Element], etree._Element],
+                         encoding: str = None) -> Iterator[etree._Element]:
+    # Yields complete items which are direct children of `items_root(root)` element,
+    # processed items are removed from tree so memory usage does not depend on feed size
+    context = etree.iterparse(reader,
+                              events=('end',),
+                              encoding=encoding,
+                              remove_comments=True,
+                              remove_pis=True,
+                              no_network=True,
+                              resolve_entities=False,
+                              huge_tree=False)
+    parent = None
+    for _, elem in context:
+        if item_tag_name not in elem.tag:
+            continue
+        if parent is None:
+            parent = items_root(elem.getroottree().getroot())
+        if elem.getparent() is not parent:
+            continue
+        yield elem
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
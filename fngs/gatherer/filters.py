@@ -1,3 +1,7 @@
+from django.db.models import (
+    Exists,
+    OuterRef,
+)
 from django_filters import rest_framework as filters
 from gatherer.models import *
 
@@ -83,3 +87,37 @@ class SimilarDigestRecordsByDigestRecordFilter(filters.FilterSet):
 
     def similar_records_filter(self, queryset, name, value):
         return queryset.filter(digest_records__in=DigestRecord.objects.filter(pk=value))
+
+
+class DigestRecordsExportFilter(filters.FilterSet):
+    digest_issue = filters.NumberFilter(method='digest_issue_filter')
+    state = filters.CharFilter(method='state_filter')
+    project = filters.CharFilter(method='project_filter')
+    dt_from = filters.IsoDateTimeFilter(method='dt_from_filter')
+    dt_to = filters.IsoDateTimeFilter(method='dt_to_filter')
+
+    class Meta:
+        model = DigestRecord
+        fields = [
+            'digest_issue',
+            'state',
+            'project',
+            'dt_from',
+            'dt_to',
+        ]
+
+    def digest_issue_filter(self, queryset, name, value):
+        return queryset.filter(digest_issue__number=value)
+
+    def state_filter(self, queryset, name, value):
+        return queryset.filter(state=value)
+
+    def project_filter(self, queryset, name, value):
+        return queryset.filter(Exists(DigestRecord.projects.through.objects.filter(digestrecord_id=OuterRef('pk'),
+                                                                                   project__name=value)))
+
+    def dt_from_filter(self, queryset, name, value):
+        return queryset.filter(dt__gte=value)
+
+    def dt_to_filter(self, queryset, name, value):
+        return queryset.filter(dt__lt=value)
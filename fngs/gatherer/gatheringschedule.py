@@ -0,0 +1,92 @@
+import datetime
+from typing import (
+    Dict,
+    Iterable,
+    List,
+)
+
+from django.db.models import (
+    Max,
+    Min,
+    Sum,
+)
+
+from gatherer.models import (
+    DigestGatheringIteration,
+    DigestRecordsSource,
+)
+
+
+MIN_POLLING_INTERVAL = datetime.timedelta(minutes=5)
+MAX_POLLING_INTERVAL = datetime.timedelta(hours=24)
+DEFAULT_POLLING_INTERVAL = datetime.timedelta(hours=1)
+# Rate of new posts is estimated over this period
+POSTING_RATE_PERIOD = datetime.timedelta(days=14)
+# Source is polled so often that about this count of new posts is found on each poll
+NEW_POSTS_PER_POLL = 1
+# Cron does not start script exactly in time, so sources which are due a bit later are polled too
+SCHEDULING_TOLERANCE = datetime.timedelta(minutes=1)
+
+
+def polling_interval(saved_count: int, history_duration: datetime.timedelta, failures_count: int) -> datetime.timedelta:
+    if history_duration <= datetime.timedelta(0):
+        interval = DEFAULT_POLLING_INTERVAL
+    elif not saved_count:
+        # Quiet source, posts will be got anyway as feeds keep several last posts
+        interval = MAX_POLLING_INTERVAL
+    else:
+        interval = history_duration * NEW_POSTS_PER_POLL / saved_count
+    interval = max(MIN_POLLING_INTERVAL, min(interval, MAX_POLLING_INTERVAL))
+    if failures_count:
+        # Exponential backoff for failing sources
+        interval = min(interval * 2 ** min(failures_count, 16), MAX_POLLING_INTERVAL)
+    return interval
+
+
+def _failures_counts(sources_ids: Iterable[int], since_dt: datetime.datetime) -> Dict[int, int]:
+    failures_counts = {}
+    finished_sources_ids = set()
+    iterations = (DigestGatheringIteration.objects.filter(source_id__in=sources_ids, dt__gte=since_dt)
+                                                  .order_by('-dt')
+                                                  .values_list('source_id', 'source_error', 'parser_error'))
+    for source_id, source_error, parser_error in iterations.iterator():
+        if source_id in finished_sources_ids:
+            continue
+        if source_error or parser_error:
+            failures_counts[source_id] = failures_counts.get(source_id, 0) + 1
+        else:
+            finished_sources_ids.add(source_id)
+    return failures_counts
+
+
+def next_polling_dts(sources: List[DigestRecordsSource], dt_now: datetime.datetime) -> Dict[int, datetime.datetime or None]:
+    sources_ids = [source.pk for source in sources]
+    history = {
+        source_id: (saved_count, first_dt, last_dt)
+        for source_id, saved_count, first_dt, last_dt in (
+            DigestGatheringIteration.objects.filter(source_id__in=sources_ids, dt__gte=dt_now - POSTING_RATE_PERIOD)
+                                            .values('source_id')
+                                            .annotate(saved_count=Sum('saved_count'),
+                                                      first_dt=Min('dt'),
+                                                      last_dt=Max('dt'))
+                                            .values_list('source_id', 'saved_count', 'first_dt', 'last_dt')
+        )
+    }
+    # Only recent iterations matter for backoff, so it is enough to look through the longest interval
+    failures_counts = _failures_counts(sources_ids, dt_now - 2 * MAX_POLLING_INTERVAL)
+    next_dts = {}
+    for source_id in sources_ids:
+        if source_id not in history:
+            # Never polled or not polled for a long time
+            next_dts[source_id] = None
+            continue
+        saved_count, first_dt, last_dt = history[source_id]
+        interval = polling_interval(saved_count or 0, dt_now - first_dt, failures_counts.get(source_id, 0))
+        next_dts[source_id] = last_dt + interval
+    return next_dts
+
+
+def sources_due(sources: List[DigestRecordsSource], dt_now: datetime.datetime) -> List[DigestRecordsSource]:
+    next_dts = next_polling_dts(sources, dt_now)
+    return [source for source in sources
+            if next_dts[source.pk] is None or next_dts[source.pk] <= dt_now + SCHEDULING_TOLERANCE]
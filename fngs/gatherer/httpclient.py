@@ -0,0 +1,79 @@
+import logging
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'
+DEFAULT_TIMEOUT_SECONDS = 30
+DEFAULT_RETRIES_COUNT = 2
+DEFAULT_BACKOFF_SECONDS = 1
+MAX_BACKOFF_SECONDS = 60
+# Count of hosts with kept connections and count of kept connections per host
+DEFAULT_HOSTS_COUNT = 256
+DEFAULT_CONNECTIONS_PER_HOST_COUNT = 8
+RETRIABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+
+    def __init__(self,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 retries_count: int = DEFAULT_RETRIES_COUNT,
+                 backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 hosts_count: int = DEFAULT_HOSTS_COUNT,
+                 connections_per_host_count: int = DEFAULT_CONNECTIONS_PER_HOST_COUNT):
+        self.timeout = timeout
+        self.retries_count = retries_count
+        self.backoff_seconds = backoff_seconds
+        self.session = requests.Session()
+        # Retries are done by client itself to log each attempt and to add jitter to delays
+        adapter = HTTPAdapter(pool_connections=hosts_count,
+                              pool_maxsize=connections_per_host_count,
+                              max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        # Brotli is offered only if its decoder is installed
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            **make_headers(accept_encoding=True),
+        })
+
+    def get(self, url: str, headers: dict = None, logger: logging.Logger = None, stream: bool = False) -> requests.Response:
+        # Body of streamed response is not read here and response should be closed by caller
+        logger = logger or logging.getLogger(__name__)
+        attempt = 0
+        while True:
+            begin_time = time.monotonic()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.debug(f'GET {url} failed in {time.monotonic() - begin_time:.3f}s (attempt {attempt + 1}): {e}')
+                if attempt >= self.retries_count:
+                    raise
+                response = None
+            else:
+                size = response.headers.get('Content-Length', 'unknown count of') if stream else len(response.content)
+                logger.debug(f'GET {url} returned {response.status_code} in {time.monotonic() - begin_time:.3f}s '
+                             f'({size} byte(s), attempt {attempt + 1})')
+                if response.status_code not in RETRIABLE_STATUS_CODES or attempt >= self.retries_count:
+                    return response
+                response.close()
+            delay = self._retry_delay(attempt, response)
+            logger.debug(f'Retrying GET {url} in {delay:.1f}s')
+            time.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, attempt: int, response: requests.Response or None) -> float:
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        # Full jitter keeps sources on the same host from retrying in lockstep
+        return random.uniform(0, min(self.backoff_seconds * 2 ** attempt, MAX_BACKOFF_SECONDS))
+
+
+http_client = HttpClient()
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
+
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from gatherer.models import Keyword
+from gatherer.keywordsmatcher import KeywordsMatcher
+
+
+# Signals invalidate index only in the process where keyword was changed,
+# so other processes (gunicorn workers, cron jobs) rebuild it after this timeout
+KEYWORDS_INDEX_TTL_SECONDS = 300
+
+
+class KeywordsIndex:
+
+    def __init__(self, keywords: List[Keyword]):
+        self.keywords = keywords
+        self.by_name: Dict[str, List[Keyword]] = {}
+        for keyword in keywords:
+            self.by_name.setdefault(keyword.name, []).append(keyword)
+        self.generic = [k for k in keywords if k.is_generic is True]
+        self.specific = [k for k in keywords if k.is_generic is False]
+        self.proprietary = [k for k in keywords if k.proprietary]
+        self.enabled = [k for k in keywords if k.enabled]
+        self.matcher = KeywordsMatcher(k.name for k in keywords)
+        self._filtration_matchers: Dict[Tuple[bool, bool], KeywordsMatcher] = {}
+        self._filtration_matchers_lock = threading.Lock()
+
+    def filtration_matcher(self, generic: bool, specific: bool) -> KeywordsMatcher:
+        with self._filtration_matchers_lock:
+            if (generic, specific) not in self._filtration_matchers:
+                keywords_names = []
+                if generic:
+                    keywords_names += [k.name for k in self.generic if not k.proprietary]
+                if specific:
+                    keywords_names += [k.name for k in self.specific if not k.proprietary]
+                self._filtration_matchers[(generic, specific)] = KeywordsMatcher(keywords_names)
+            return self._filtration_matchers[(generic, specific)]
+
+
+_keywords_index: KeywordsIndex or None = None
+_keywords_index_build_time: float or None = None
+_keywords_index_version = 0
+_keywords_index_lock = threading.Lock()
+
+
+def keywords_index() -> KeywordsIndex:
+    global _keywords_index
+    global _keywords_index_build_time
+    with _keywords_index_lock:
+        if _keywords_index is not None and time.monotonic() - _keywords_index_build_time < KEYWORDS_INDEX_TTL_SECONDS:
+            return _keywords_index
+        version = _keywords_index_version
+    index = KeywordsIndex(list(Keyword.objects.all().order_by('id')))
+    with _keywords_index_lock:
+        # Do not cache index if keywords were changed while it was building
+        if version == _keywords_index_version:
+            _keywords_index = index
+            _keywords_index_build_time = time.monotonic()
+    return index
+
+
+@receiver(post_save, sender=Keyword, dispatch_uid='invalidate_keywords_index_on_save')
+@receiver(post_delete, sender=Keyword, dispatch_uid='invalidate_keywords_index_on_delete')
+def invalidate_keywords_index(*args, **kwargs):
+    global _keywords_index
+    global _keywords_index_version
+    with _keywords_index_lock:
+        _keywords_index = None
+        _keywords_index_version += 1
@@ -0,0 +1,98 @@
+import re
+from typing import (
+    Dict,
+    Iterable,
+    List,
+)
+
+
+WORD_CHAR_REGEXP = re.compile(r'\w')
+
+
+def _lower_char(c: str) -> str:
+    # Keep one-to-one positions mapping between original and lowercased text
+    lowered = c.lower()
+    return lowered if len(lowered) == 1 else c
+
+
+def _lower(text: str) -> str:
+    return ''.join(_lower_char(c) for c in text)
+
+
+def _is_word_char(c: str) -> bool:
+    return WORD_CHAR_REGEXP.match(c) is not None
+
+
+class KeywordsMatcher:
+    # Aho-Corasick automaton over lowercased keywords names, all matches are found in one pass over title
+    # and then checked for word boundaries the same way as `\b{keyword}\b` regular expression does
+
+    def __init__(self, keywords_names: Iterable[str]):
+        self.keywords_names: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        known_keywords_names = set()
+        for keyword_name in keywords_names:
+            if not keyword_name or keyword_name in known_keywords_names:
+                continue
+            known_keywords_names.add(keyword_name)
+            self.keywords_names.append(keyword_name)
+            self._add(_lower(keyword_name), len(self.keywords_names) - 1)
+        self._build_fail_links()
+
+    def _add(self, lowered_keyword_name: str, keyword_index: int):
+        state = 0
+        for c in lowered_keyword_name:
+            next_state = self._goto[state].get(c)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[state][c] = next_state
+            state = next_state
+        self._outputs[state].append(keyword_index)
+
+    def _build_fail_links(self):
+        queue = list(self._goto[0].values())
+        queue_i = 0
+        while queue_i < len(queue):
+            state = queue[queue_i]
+            queue_i += 1
+            for c, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail_state = self._fail[state]
+                while fail_state and c not in self._goto[fail_state]:
+                    fail_state = self._fail[fail_state]
+                self._fail[next_state] = self._goto[fail_state].get(c, 0)
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def _iterate_matches(self, title: str):
+        if not title or not self.keywords_names:
+            return
+        lowered_title = _lower(title)
+        state = 0
+        for end_i, c in enumerate(lowered_title):
+            while state and c not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(c, 0)
+            for keyword_index in self._outputs[state]:
+                begin_i = end_i + 1 - len(self.keywords_names[keyword_index])
+                if self._is_word_boundary(title, begin_i) and self._is_word_boundary(title, end_i + 1):
+                    yield keyword_index
+
+    @staticmethod
+    def _is_word_boundary(text: str, i: int) -> bool:
+        before = i > 0 and _is_word_char(text[i - 1])
+        after = i < len(text) and _is_word_char(text[i])
+        return before != after
+
+    def find(self, title: str) -> List[str]:
+        matched_indexes = set(self._iterate_matches(title))
+        return [self.keywords_names[i] for i in sorted(matched_indexes)]
+
+    def matches(self, title: str) -> bool:
+        for _ in self._iterate_matches(title):
+            return True
+        return False
@@ -0,0 +1,126 @@
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+)
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from gatherer.models import (
+    DigestRecord,
+    Keyword,
+    KeywordRetaggingQueueItem,
+)
+from gatherer.keywordsindex import (
+    KeywordsIndex,
+    invalidate_keywords_index,
+    keywords_index,
+)
+
+
+DEFAULT_RETAGGING_CHUNK_SIZE = 2000
+DigestRecordTitleKeywords = DigestRecord.title_keywords.through
+
+
+def matched_keywords_ids(index: KeywordsIndex, title: str) -> Set[int]:
+    keywords_ids = set()
+    for keyword_name in index.matcher.find(title):
+        keywords_ids.update(k.id for k in index.by_name[keyword_name])
+    return keywords_ids
+
+
+def match_titles(titles: List[str]) -> List[Set[int]]:
+    # Module level function to be usable in process pool, forked processes reuse index built in main process
+    index = keywords_index()
+    return [matched_keywords_ids(index, title) for title in titles]
+
+
+def iterate_digest_records_chunks(queryset, chunk_size: int = DEFAULT_RETAGGING_CHUNK_SIZE) -> Iterator[List[Tuple[int, str]]]:
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', 'title')[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        yield chunk
+
+
+def _title_keywords_rows_ids(digest_records_ids: List[int]) -> Dict[int, Dict[int, int]]:
+    # Digest record id -> keyword id -> through table row id
+    rows_ids = {digest_record_id: {} for digest_record_id in digest_records_ids}
+    for row_id, digest_record_id, keyword_id in DigestRecordTitleKeywords.objects.filter(digestrecord_id__in=digest_records_ids) \
+                                                                                 .values_list('id', 'digestrecord_id', 'keyword_id'):
+        rows_ids[digest_record_id][keyword_id] = row_id
+    return rows_ids
+
+
+def save_title_keywords_diff(keywords_ids_by_digest_record_id: Dict[int, Set[int]]) -> List[Tuple[int, Set[int], Set[int]]]:
+    # Only changed through table rows are inserted or deleted, returns (digest record id, added, removed) for changed records
+    old_rows_ids = _title_keywords_rows_ids(list(keywords_ids_by_digest_record_id))
+    changes = []
+    removed_rows_ids = []
+    for digest_record_id, keywords_ids in keywords_ids_by_digest_record_id.items():
+        old_keywords_ids = set(old_rows_ids[digest_record_id])
+        if keywords_ids != old_keywords_ids:
+            removed_keywords_ids = old_keywords_ids - keywords_ids
+            changes.append((digest_record_id, keywords_ids - old_keywords_ids, removed_keywords_ids))
+            removed_rows_ids += [old_rows_ids[digest_record_id][keyword_id] for keyword_id in removed_keywords_ids]
+    if not changes:
+        return changes
+    with transaction.atomic():
+        if removed_rows_ids:
+            DigestRecordTitleKeywords.objects.filter(id__in=removed_rows_ids).delete()
+        DigestRecordTitleKeywords.objects.bulk_create([DigestRecordTitleKeywords(digestrecord_id=digest_record_id,
+                                                                                 keyword_id=keyword_id)
+                                                       for digest_record_id, added_keywords_ids, _ in changes
+                                                       for keyword_id in added_keywords_ids],
+                                                      ignore_conflicts=True)
+    return changes
+
+
+def keyword_candidates_digest_records(keyword: Keyword):
+    # Records which could get or lose keyword, title search is backed by trigram index,
+    # currently tagged records cover previous keyword name
+    return DigestRecord.objects.filter(Q(title__icontains=keyword.name)
+                                       | Q(id__in=DigestRecordTitleKeywords.objects.filter(keyword_id=keyword.id)
+                                                                                   .values('digestrecord_id')))
+
+
+def retag_keyword_digest_records(keyword: Keyword, chunk_size: int = DEFAULT_RETAGGING_CHUNK_SIZE) -> int:
+    updated_digest_records_count = 0
+    for chunk in iterate_digest_records_chunks(keyword_candidates_digest_records(keyword), chunk_size):
+        updated_digest_records_count += len(save_title_keywords_diff({digest_record_id: keywords_ids
+                                                                      for (digest_record_id, _), keywords_ids in zip(chunk, match_titles([title for _, title in chunk]))}))
+    return updated_digest_records_count
+
+
+def retag_queued_keywords(chunk_size: int = DEFAULT_RETAGGING_CHUNK_SIZE) -> Dict[int, int]:
+    # Returns count of updated digest records by keyword id, keywords queued while retagging are left for next call
+    updated_digest_records_counts = {}
+    with transaction.atomic():
+        # Skipping locked items allows running several workers on the same queue
+        queue_items = list(KeywordRetaggingQueueItem.objects.select_for_update(skip_locked=True)
+                                                            .order_by('id')
+                                                            .values_list('id', 'keyword_id'))
+        if not queue_items:
+            return updated_digest_records_counts
+        # Keywords could be changed by another process, so its invalidation signals were not received by this one
+        invalidate_keywords_index()
+        for keyword in Keyword.objects.filter(id__in={keyword_id for _, keyword_id in queue_items}).order_by('id'):
+            updated_digest_records_counts[keyword.id] = retag_keyword_digest_records(keyword, chunk_size)
+        KeywordRetaggingQueueItem.objects.filter(id__in=[queue_item_id for queue_item_id, _ in queue_items]).delete()
+    return updated_digest_records_counts
+
+
+@receiver(post_save, sender=Keyword, dispatch_uid='enqueue_keyword_retagging_on_save')
+def enqueue_keyword_retagging_on_save(sender, instance: Keyword, raw=False, **kwargs):
+    # Retagging of generic keyword could update lots of records, so it is done by `updatekeywords --queue` worker.
+    # Deleted keywords are removed from records by cascade, so only saved ones are handled
+    if raw:
+        return
+    KeywordRetaggingQueueItem.objects.create(keyword=instance)
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand
+
+import time
+
+import dateutil.parser
+import pytz
+
+from gatherer.models import DigestRecordsSource
+from gatherer.dateparsing import (
+    RUSSIAN_TO_ENGLISH_DATE_NAMES,
+    is_fast_parseable,
+    parse_feed_datetime,
+)
+
+from .logger import Logger
+from . import sources
+custom_logger = Logger()
+
+
+DEFAULT_REPEATS_COUNT = 1000
+
+
+def _parse_with_dateutil(date_str):
+    # Previous way of parsing dates in RSS parsing modules
+    for ru, en in RUSSIAN_TO_ENGLISH_DATE_NAMES.items():
+        date_str = date_str.replace(ru, en)
+    dt = dateutil.parser.parse(date_str)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=pytz.UTC)
+    return dt
+
+
+def _parse_without_cache(date_str):
+    return parse_feed_datetime.__wrapped__(date_str)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parsing of feeds dates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-n',
+                            '--repeats',
+                            type=int,
+                            default=DEFAULT_REPEATS_COUNT,
+                            help=f'Count of times each date is parsed, default - {DEFAULT_REPEATS_COUNT}')
+        dates_source_group = parser.add_mutually_exclusive_group(required=True)
+        dates_source_group.add_argument('-f',
+                                        '--file',
+                                        help='File with dates strings to parse, one per line')
+        dates_source_group.add_argument('--from-feeds',
+                                        action='store_true',
+                                        help='Fetch dates strings from feeds of enabled RSS sources')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            with open(options['file']) as fin:
+                dates_strs = [line.strip() for line in fin if line.strip()]
+        else:
+            dates_strs = self._fetch_dates_strs()
+        fast_count = 0
+        for date_str in dates_strs:
+            expected_dt = _parse_with_dateutil(date_str)
+            dt = parse_feed_datetime(date_str)
+            if dt != expected_dt or dt.utcoffset() != expected_dt.utcoffset():
+                self.stdout.write(f'Mismatch for "{date_str}": {dt} instead of {expected_dt}')
+            if is_fast_parseable(date_str):
+                fast_count += 1
+        self.stdout.write(f'{len(dates_strs)} date(s), {fast_count} parsed without dateutil, {options["repeats"]} repeat(s)')
+        if not dates_strs:
+            return
+        baseline_seconds = None
+        for name, parse in (('dateutil', _parse_with_dateutil),
+                            ('fast paths', _parse_without_cache),
+                            ('fast paths with cache', parse_feed_datetime)):
+            parse_feed_datetime.cache_clear()
+            begin_time = time.perf_counter()
+            for _ in range(options['repeats']):
+                for date_str in dates_strs:
+                    parse(date_str)
+            seconds = time.perf_counter() - begin_time
+            if baseline_seconds is None:
+                baseline_seconds = seconds
+            self.stdout.write(f'{name}: {seconds:.3f}s, {seconds / (options["repeats"] * len(dates_strs)) * 1e6:.2f}us per date, '
+                              f'x{baseline_seconds / seconds:.1f}')
+
+    @staticmethod
+    def _fetch_dates_strs():
+        dates_strs = []
+        for source in DigestRecordsSource.objects.filter(enabled=True).order_by('name'):
+            parsing_module_class = getattr(sources, f'{source.name}ParsingModule', None)
+            if parsing_module_class is None or not issubclass(parsing_module_class, sources.RssBasicParsingModule):
+                continue
+            try:
+                source_dates_strs = list(parsing_module_class(custom_logger).fetch_dates_strs())
+            except Exception as e:
+                custom_logger.error(f'Failed to fetch dates from "{source.name}": {str(e)}')
+                continue
+            custom_logger.info(f'Fetched {len(source_dates_strs)} date(s) from "{source.name}"')
+            dates_strs += source_dates_strs
+        return dates_strs
@@ -1,4 +1,5 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import prefetch_related_objects
 
 from gatherer.models import *
 
@@ -6,7 +7,8 @@ import logging
 import os
 import json
 import math
-from pprint import pprint
+import sys
+import textwrap
 
 
 from .logger import Logger
@@ -15,10 +17,122 @@ parse_all = False
 records_limit: int or None = None
 similar_records_limit: int or None = None
 output_format: str or None = None
+chunk_size: int or None = None
 
 
 SCRIPT_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+OUTPUT_FORMATS = ('JSON', 'JSONL', 'CSV', 'PARQUET')
+DEFAULT_OUTPUT_FORMAT = 'JSON'
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class JsonWriter:
+
+    def __init__(self, fout):
+        self.fout = fout
+        self.empty = True
+
+    def write(self, item):
+        # Same layout as `json.dump(items, fout, indent=4)`, but without keeping all items in memory
+        self.fout.write('[\n' if self.empty else ',\n')
+        self.fout.write(textwrap.indent(json.dumps(item, indent=4), '    '))
+        self.empty = False
+
+    def close(self):
+        self.fout.write('[]' if self.empty else '\n]')
+
+
+class JsonLinesWriter:
+
+    def __init__(self, fout):
+        self.fout = fout
+
+    def write(self, item):
+        self.fout.write(json.dumps(item, ensure_ascii=False))
+        self.fout.write('\n')
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+
+    def __init__(self, fout, line_builder):
+        self.fout = fout
+        self.line_builder = line_builder
+
+    def write(self, item):
+        self.fout.write(f'{self.line_builder(item)}\n')
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+
+    def __init__(self, path, schema_builder):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise Exception('`pyarrow` package is required for PARQUET output format')
+        self.pyarrow = pyarrow
+        self.schema = schema_builder(pyarrow)
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, item):
+        self.rows.append(item)
+        if len(self.rows) >= chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if self.rows:
+            self.writer.write_table(self.pyarrow.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def digest_records_parquet_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('datetime', pa.string()),
+        ('digest_number', pa.int64()),
+        ('state', pa.string()),
+        ('title', pa.string()),
+        ('description', pa.string()),
+        ('type', pa.string()),
+        ('category', pa.string()),
+        ('keywords', pa.list_(pa.struct([
+            ('name', pa.string()),
+            ('foss', pa.bool_()),
+            ('generic', pa.bool_()),
+            ('category', pa.string()),
+        ]))),
+        ('language', pa.string()),
+        ('url', pa.string()),
+    ])
+
+
+def digest_similar_records_parquet_schema(pa):
+    return pa.schema([
+        ('id', pa.int64()),
+        ('digest_number', pa.int64()),
+        ('digest_records_ids', pa.list_(pa.int64())),
+    ])
+
+
+def digest_record_csv_line(digest_record_plain):
+    s = f'{digest_record_plain["id"]}\t{digest_record_plain["title"]}\t{digest_record_plain["url"]}'
+    if [k for k in digest_record_plain['keywords'] if not k['generic']]:
+        for k in digest_record_plain['keywords']:
+            if not k['generic']:
+                s += f'\t{k["name"]}\t{k["foss"]}\t{k["category"]}'
+    return s
 
 
 class Command(BaseCommand):
@@ -32,8 +146,9 @@ class Command(BaseCommand):
                             help='Debug mode')
         parser.add_argument('-o',
                             '--output-format',
-                            choices=('JSON', 'CSV'),
-                            help='Output format')
+                            choices=OUTPUT_FORMATS,
+                            default=DEFAULT_OUTPUT_FORMAT,
+                            help=f'Output format, JSONL and PARQUET are recommended for big dumps, default - {DEFAULT_OUTPUT_FORMAT}')
         parser.add_argument('-a',
                             '--all',
                             action='store_true',
@@ -47,23 +162,65 @@ class Command(BaseCommand):
         parser.add_argument('-p',
                             '--similar-records-limit',
                             help='Dump only specified count of similar records')
+        parser.add_argument('-c',
+                            '--chunk-size',
+                            type=int,
+                            default=DEFAULT_CHUNK_SIZE,
+                            help=f'Count of records loaded from database at once, default - {DEFAULT_CHUNK_SIZE}')
         parser.add_argument('DIGEST_RECORDS_SAVE_PATH',
                             help='File path to store digest records')
 
     def handle(self, *args, **options):
         self._init_globals(**options)
-        digest_records_plain = []
-        digest_record_object: DigestRecord
-        custom_logger.info('Started preparation of digest records')
+        if options['similar_records_save_path'] and output_format == 'CSV':
+            raise CommandError('CSV output format is not supported for similar digest records')
         if parse_all:
             digest_records_queryset = DigestRecord.objects.all()
         else:
             digest_records_queryset = DigestRecord.objects.filter(state='IN_DIGEST')
-        last_printed_percent = None
-        for digest_record_object_i, digest_record_object in enumerate(digest_records_queryset):
+        digest_records_queryset = digest_records_queryset.select_related('digest_issue').order_by('id')
+        if records_limit is not None:
+            digest_records_queryset = digest_records_queryset[:records_limit]
+        custom_logger.info(f'Saving digest records to "{options["DIGEST_RECORDS_SAVE_PATH"]}"')
+        self._dump(options['DIGEST_RECORDS_SAVE_PATH'],
+                   self._iterate_digest_records_plain(digest_records_queryset),
+                   digest_records_queryset.count(),
+                   digest_record_csv_line,
+                   digest_records_parquet_schema)
+        custom_logger.info('Saved')
+
+        if options['similar_records_save_path']:
+            digest_similar_records_queryset = SimilarDigestRecords.objects.select_related('digest_issue').order_by('id')
+            if similar_records_limit is not None:
+                digest_similar_records_queryset = digest_similar_records_queryset[:similar_records_limit]
+            custom_logger.info(f'Saving similar digest records to "{options["similar_records_save_path"]}"')
+            self._dump(options['similar_records_save_path'],
+                       self._iterate_digest_similar_records_plain(digest_similar_records_queryset),
+                       digest_similar_records_queryset.count(),
+                       None,
+                       digest_similar_records_parquet_schema)
+            custom_logger.info('Saved')
+
+    @staticmethod
+    def _iterate_in_chunks(queryset, prefetch_lookups):
+        # `prefetch_related` is ignored by `iterator`, so relations are prefetched for each chunk separately
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                prefetch_related_objects(chunk, *prefetch_lookups)
+                yield from chunk
+                chunk = []
+        if chunk:
+            prefetch_related_objects(chunk, *prefetch_lookups)
+            yield from chunk
+
+    def _iterate_digest_records_plain(self, digest_records_queryset):
+        digest_record_object: DigestRecord
+        for digest_record_object in self._iterate_in_chunks(digest_records_queryset, ('title_keywords',)):
             if not parse_all and digest_record_object.digest_issue is None:
                 custom_logger.error(f'Empty digest issue for digest record object #{digest_record_object.id}')
-            digest_record_plain = {
+            yield {
                 'id': digest_record_object.id,
                 'datetime': (digest_record_object.dt if digest_record_object.dt else digest_record_object.gather_dt).strftime(DATETIME_FORMAT),
                 'digest_number': digest_record_object.digest_issue.number if digest_record_object.digest_issue else None,
@@ -73,69 +230,49 @@ class Command(BaseCommand):
                 'type': digest_record_object.content_type,
                 'category': digest_record_object.content_category,
                 'keywords': [{'name': k.name, 'foss': not k.proprietary, 'generic': k.is_generic, 'category': k.content_category}
-                             for k in digest_record_object.title_keywords.all()] if digest_record_object.title_keywords else [],
+                             for k in digest_record_object.title_keywords.all()],
                 'language': digest_record_object.language,
                 'url': digest_record_object.url,
             }
-            digest_records_plain.append(digest_record_plain)
-            percent = math.floor(digest_record_object_i / digest_records_queryset.count() * 100)
-            if last_printed_percent is None or percent != last_printed_percent:
-                custom_logger.info(f'Processed {percent}%')
-                last_printed_percent = percent
-            if records_limit is not None and digest_record_object_i > records_limit:
-                custom_logger.info('Stopped export because of set records limit')
-                break
-        if last_printed_percent is not None and last_printed_percent != 100:
-            custom_logger.info(f'Processed 100%')
-        custom_logger.info('Finished preparation of digest records')
-
-        digest_similar_records_plain = []
-        if options['similar_records_save_path']:
-            digest_similar_records_object: SimilarDigestRecords
-            custom_logger.info('Started preparation of similar digest records')
-            digest_similar_records_queryset = SimilarDigestRecords.objects.all()
+
+    def _iterate_digest_similar_records_plain(self, digest_similar_records_queryset):
+        digest_similar_records_object: SimilarDigestRecords
+        for digest_similar_records_object in self._iterate_in_chunks(digest_similar_records_queryset, ('digest_records',)):
+            if not parse_all and digest_similar_records_object.digest_issue is None:
+                custom_logger.error(f'Empty digest issue for digest similar records object #{digest_similar_records_object.id}')
+            yield {
+                'id': digest_similar_records_object.id,
+                'digest_number': digest_similar_records_object.digest_issue.number if digest_similar_records_object.digest_issue else None,
+                'digest_records_ids': [dr.id for dr in digest_similar_records_object.digest_records.all()],
+            }
+
+    @staticmethod
+    def _dump(path, items_plain, items_count, csv_line_builder, parquet_schema_builder):
+        if output_format == 'PARQUET':
+            writer = ParquetWriter(path, parquet_schema_builder)
+            fout = None
+        else:
+            fout = open(path, 'w')
+            if output_format == 'JSON':
+                writer = JsonWriter(fout)
+            elif output_format == 'JSONL':
+                writer = JsonLinesWriter(fout)
+            else:
+                writer = CsvWriter(fout, csv_line_builder)
+        try:
             last_printed_percent = None
-            for digest_similar_records_object_i, digest_similar_records_object in enumerate(digest_similar_records_queryset):
-                if not parse_all and digest_similar_records_object.digest_issue is None:
-                    custom_logger.error(f'Empty digest issue for digest similar records object #{digest_similar_records_object.id}')
-                digest_similar_records_one_plain = {
-                    'id': digest_similar_records_object.id,
-                    'digest_number': digest_record_object.digest_issue.number if digest_record_object.digest_issue else None,
-                    'digest_records_ids': [dr.id for dr in digest_similar_records_object.digest_records.all()],
-                }
-                digest_similar_records_plain.append(digest_similar_records_one_plain)
-                percent = math.floor(digest_similar_records_object_i / digest_similar_records_queryset.count() * 100)
+            for item_i, item_plain in enumerate(items_plain):
+                writer.write(item_plain)
+                percent = math.floor(item_i / items_count * 100)
                 if last_printed_percent is None or percent != last_printed_percent:
                     custom_logger.info(f'Processed {percent}%')
                     last_printed_percent = percent
-                if similar_records_limit is not None and digest_similar_records_object_i > similar_records_limit:
-                    custom_logger.info('Stopped export because of set similar records limit')
-                    break
+            writer.close()
             if last_printed_percent is not None and last_printed_percent != 100:
                 custom_logger.info(f'Processed 100%')
-            custom_logger.info('Finished preparation of similar digest records')
-
-        custom_logger.info(f'Saving digest records to "{options["DIGEST_RECORDS_SAVE_PATH"]}"')
-        with open(options['DIGEST_RECORDS_SAVE_PATH'], 'w') as fout:
-            if output_format == 'JSON':
-                json.dump(digest_records_plain, fout, indent=4)
-            elif output_format == 'CSV':
-                for digest_record_plain in digest_records_plain:
-                    s = f'{digest_record_plain["id"]}\t{digest_record_plain["title"]}\t{digest_record_plain["url"]}'
-                    if [k for k in digest_record_plain['keywords'] if not k['generic']]:
-                        for k in digest_record_plain['keywords']:
-                            if not k['generic']:
-                                s += f'\t{k["name"]}\t{k["foss"]}\t{k["category"]}'
-                    fout.write(f'{s}\n')
-        custom_logger.info('Saved')
-        if options['similar_records_save_path']:
-            custom_logger.info(f'Saving similar digest records to "{options["similar_records_save_path"]}"')
-            with open(options['similar_records_save_path'], 'w') as fout:
-                if output_format == 'JSON':
-                    json.dump(digest_similar_records_plain, fout, indent=4)
-                else:
-                    raise NotImplementedError
-            custom_logger.info('Saved')
+        finally:
+            if fout is not None:
+                fout.close()
 
     def _init_globals(self, **options):
         if options['debug']:
@@ -149,6 +286,10 @@ class Command(BaseCommand):
         if options['similar_records_limit'] is not None:
             global similar_records_limit
             similar_records_limit = int(options['similar_records_limit'])
-        if options['output_format'] is not None:
-            global output_format
-            output_format = options['output_format']
+        global output_format
+        output_format = options['output_format']
+        if options['chunk_size'] < 1:
+            custom_logger.error('Chunk size should be positive')
+            sys.exit(1)
+        global chunk_size
+        chunk_size = options['chunk_size']
@@ -1,18 +1,30 @@
 from django.core.management.base import BaseCommand
 
 from ds.models import *
+from ds.lemmas import enqueue_digest_records_lemmas_indexing
 
 import dateutil.parser
 import logging
 import sys
 import os
 import traceback
-import lemminflect
-import nltk
 from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+from django.db import connection, transaction
 
 
 from .sources import *
+from gatherer.keywordsindex import keywords_index
+from gatherer.digestrecordsdates import backfill_digest_records_dates
+from gatherer.gatheringschedule import sources_due
+from gatherer.httpclient import (
+    DEFAULT_CONNECTIONS_PER_HOST_COUNT,
+    DEFAULT_RETRIES_COUNT,
+    DEFAULT_TIMEOUT_SECONDS,
+    HttpClient,
+)
 
 from .logger import Logger
 SCRIPT_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
@@ -22,6 +34,14 @@ SCRIPT_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 
 parsing_modules_names = []
 days_count = None
+workers_count = None
+max_workers_per_host = None
+force_fetching = None
+http_timeout = None
+http_retries_count = None
+
+DEFAULT_WORKERS_COUNT = 8
+DEFAULT_MAX_WORKERS_PER_HOST = 2
 
 
 class Command(BaseCommand):
@@ -33,6 +53,31 @@ class Command(BaseCommand):
                             '--debug',
                             action='store_true',
                             help='Debug mode')
+        parser.add_argument('-w',
+                            '--workers',
+                            type=int,
+                            default=DEFAULT_WORKERS_COUNT,
+                            help=f'Count of sources fetched in parallel, default - {DEFAULT_WORKERS_COUNT}')
+        parser.add_argument('--max-per-host',
+                            type=int,
+                            default=DEFAULT_MAX_WORKERS_PER_HOST,
+                            help=f'Max count of sources fetched in parallel from one host, default - {DEFAULT_MAX_WORKERS_PER_HOST}')
+        parser.add_argument('-f',
+                            '--force',
+                            action='store_true',
+                            help='Fetch and parse sources fully even if they were not modified since previous fetching')
+        parser.add_argument('-s',
+                            '--schedule',
+                            action='store_true',
+                            help='Gather only sources which are due according to their posting rate and errors history')
+        parser.add_argument('--http-timeout',
+                            type=float,
+                            default=DEFAULT_TIMEOUT_SECONDS,
+                            help=f'HTTP requests timeout in seconds, default - {DEFAULT_TIMEOUT_SECONDS}')
+        parser.add_argument('--http-retries',
+                            type=int,
+                            default=DEFAULT_RETRIES_COUNT,
+                            help=f'Count of HTTP requests retries on connection errors and 429/5xx responses, default - {DEFAULT_RETRIES_COUNT}')
         parser.add_argument('MODULE',
                             type=str,
                             help='Parsing module')
@@ -45,24 +90,68 @@ class Command(BaseCommand):
             self._init_globals(**options)
             custom_logger.info(f'Saving log to "{custom_logger.file_path}"')
             parsing_modules = ParsingModuleFactory.create(parsing_modules_names, custom_logger)
-            custom_logger.info('Started parsing all sources')
+            # One client for all modules, so connections to the same host are reused by different sources
+            http_client = HttpClient(timeout=http_timeout,
+                                     retries_count=http_retries_count,
+                                     connections_per_host_count=max(max_workers_per_host, DEFAULT_CONNECTIONS_PER_HOST_COUNT))
             for parsing_module in parsing_modules:
-                parsing_result = self._parse(parsing_module)
-                if parsing_result is not None:
-                    iteration, posts_data_one = parsing_result
-                    self._save_to_database(iteration, posts_data_one)
+                parsing_module.http_client = http_client
+                if force_fetching:
+                    parsing_module.conditional_fetching_enabled = False
+            custom_logger.info(f'Started parsing all sources using {workers_count} worker(s)')
+            # Sources are fetched and parsed concurrently, but everything is written to database from this thread only
+            for parsing_module, parsing_result in self._parse_concurrently(parsing_modules):
+                saving_data = self._save_iteration(parsing_module, parsing_result)
+                if saving_data is not None:
+                    iteration, posts_data_one = saving_data
+                    self._save_to_database(iteration, posts_data_one, parsing_result.outdated_posts_dts_by_url)
+                    self._save_source_validators(iteration.source, parsing_result)
             custom_logger.info(f'Finished parsing all sources, all saved to database')  # TODO: Add stats
         except Exception as e:
             custom_logger.critical(e)
             custom_logger.critical(traceback.format_exc())
             sys.exit(1)
 
-    def _parse(self, parsing_module):
-        custom_logger.info(f'Started parsing {parsing_module.source_name}')
-        parsing_result = parsing_module.parse(days_count)
+    def _parse_concurrently(self, parsing_modules: List[BasicParsingModule]):
+        # Sources are submitted only when their host has a free slot, so workers are not blocked by busy hosts
+        # while sources of other hosts wait
+        hosts_scheduler = HostsScheduler(parsing_modules, max_workers_per_host)
+        with ThreadPoolExecutor(max_workers=workers_count) as executor:
+            futures = {executor.submit(self._parse, parsing_module): parsing_module
+                       for parsing_module in hosts_scheduler.next_parsing_modules(workers_count)}
+            while futures:
+                done_futures, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    hosts_scheduler.finish(futures[future])
+                # Free workers get new sources before results are saved
+                for parsing_module in hosts_scheduler.next_parsing_modules(workers_count - len(futures) + len(done_futures)):
+                    futures[executor.submit(self._parse, parsing_module)] = parsing_module
+                for future in done_futures:
+                    yield futures.pop(future), future.result()
+
+    def _parse(self, parsing_module: BasicParsingModule):
+        try:
+            custom_logger.info(f'Started parsing {parsing_module.source_name}')
+            return parsing_module.parse(days_count)
+        finally:
+            # Each worker thread gets its own database connection, do not leave it open
+            connection.close()
+
+    def _save_iteration(self, parsing_module: BasicParsingModule, parsing_result: ParsingResult):
         source = DigestRecordsSource.objects.get(name=parsing_module.source_name)
         datetime_now = datetime.datetime.now(tz=dateutil.tz.tzlocal())
-        if parsing_result.success:
+        if parsing_result.source_unchanged:
+            iteration = DigestGatheringIteration(dt=datetime_now,
+                                                 overall_count=0,
+                                                 source_enabled=True,
+                                                 gathered_count=0,
+                                                 saved_count=0,
+                                                 source=source,
+                                                 source_unchanged=True)
+            iteration.save()
+            custom_logger.info(f'Finished parsing {parsing_module.source_name}, source not modified')
+            return None
+        elif parsing_result.success:
             posts_data_one = PostsData(parsing_module.source_name,
                                        parsing_module.projects,
                                        parsing_result.posts_data_after_filtration,
@@ -102,143 +191,165 @@ class Command(BaseCommand):
             iteration.save()
             return None
 
-    def _save_to_database(self, iteration: DigestGatheringIteration, posts_data_one: PostsData):
+    @staticmethod
+    def _save_source_validators(source: DigestRecordsSource, parsing_result: ParsingResult):
+        fields_names = ('etag', 'last_modified', 'watermark_url', 'watermark_dt', 'data_hash')
+        updated_fields_names = [field_name for field_name in fields_names
+                                if getattr(source, field_name) != getattr(parsing_result, field_name)]
+        if updated_fields_names:
+            for field_name in updated_fields_names:
+                setattr(source, field_name, getattr(parsing_result, field_name))
+            source.save(update_fields=updated_fields_names)
+
+    def _save_to_database(self, iteration: DigestGatheringIteration, posts_data_one: PostsData, outdated_posts_dts_by_url: Dict[str, datetime.datetime]):
         custom_logger.info(f'Saving to database for source "{posts_data_one.source_name}"')
         source = DigestRecordsSource.objects.get(name=posts_data_one.source_name)
-        added_digest_records_count = 0
+        source_projects = list(source.projects.all())
+        index = keywords_index()
         already_existing_digest_records_count = 0
-        already_existing_digest_records_dt_updated_count = 0
+        posts_urls = [post_data.url for post_data in posts_data_one.posts_data_list]
+        similar_records_by_url = {dr.url: dr for dr in DigestRecord.objects.filter(url__in=posts_urls).only('id', 'url', 'dt')}
+        missing_dts_by_url = {}
+        digest_records_to_add = []
+        gather_dt = datetime.datetime.now(tz=dateutil.tz.tzlocal())
         for post_data in posts_data_one.posts_data_list:
             short_post_data_str = f'{post_data.dt} "{post_data.title}" ({post_data.url})'
-            similar_records = DigestRecord.objects.filter(url=post_data.url)  # TODO: Replace check for similar records before and with "get"
-            if similar_records:
-                if not similar_records[0].dt:
-                    similar_records[0].dt = post_data.dt
-                    custom_logger.debug(f'{short_post_data_str} already exists in database, but without date, fix it')
-                    already_existing_digest_records_dt_updated_count += 1
-                    similar_records[0].save()
+            similar_record = similar_records_by_url.get(post_data.url)
+            if similar_record is not None:
+                if not similar_record.dt:
+                    # Records added from the same feed earlier are not saved yet, date will be saved with them
+                    if similar_record.pk is None:
+                        similar_record.dt = post_data.dt
+                    else:
+                        missing_dts_by_url.setdefault(post_data.url, post_data.dt)
                 else:
                     custom_logger.warning(f'{short_post_data_str} ignored, found same in database')
                     already_existing_digest_records_count += 1
                 continue
-            else:
-                custom_logger.debug(f'Adding {short_post_data_str} to database')
-                all_matched_keywords = []
-                if post_data.filtered:
-                    state = DigestRecordState.FILTERED.name
-                else:
-                    state = DigestRecordState.UNKNOWN.name
-                for keyword_name in post_data.keywords:
-                    matched_keywords_for_one = Keyword.objects.filter(name=keyword_name)
-                    if len(matched_keywords_for_one) == 0:
-                        custom_logger.error(f'Failed to find keywords with name "{keyword_name}" in database')
-                    else:
-                        if len(matched_keywords_for_one) > 1:
-                            custom_logger.warning(f'More than one keyword with name "{keyword_name}" found in database')
-                        all_matched_keywords += matched_keywords_for_one
-                if state == DigestRecordState.UNKNOWN.name and all_matched_keywords:
-                    enabled_and_valuable_matched_keywords = []
-                    if not posts_data_one.filters:
-                        for keyword in all_matched_keywords:
-                            if keyword.enabled:
-                                enabled_and_valuable_matched_keywords.append(keyword)
-                        should_be_skipped = False
-                    elif FiltrationType.SPECIFIC in posts_data_one.filters \
-                            and FiltrationType.GENERIC in posts_data_one.filters:
-                        should_be_skipped = True
-                        for keyword in all_matched_keywords:
-                            if keyword.enabled:
-                                enabled_and_valuable_matched_keywords.append(keyword)
-                    elif FiltrationType.SPECIFIC in posts_data_one.filters:
-                        should_be_skipped = True
-                        for keyword in all_matched_keywords:
-                            if keyword.enabled and not keyword.is_generic:
-                                enabled_and_valuable_matched_keywords.append(keyword)
-                    else:
-                        should_be_skipped = True
-                        for keyword in all_matched_keywords:
-                            if keyword.enabled and keyword.is_generic:
-                                enabled_and_valuable_matched_keywords.append(keyword)
-                    if enabled_and_valuable_matched_keywords:
-                        should_be_skipped = False
-                    if should_be_skipped:
-                        custom_logger.warning(f'Record "{post_data.title}" ({post_data.url}) marked as skipped after keywords check')
-                        state = DigestRecordState.SKIPPED.name
-                    else:
-                        all_proprietary = True
-                        for keyword in enabled_and_valuable_matched_keywords:
-                            if not keyword.proprietary:
-                                all_proprietary = False
-                                break
-                        if all_proprietary and enabled_and_valuable_matched_keywords:
-                            custom_logger.warning(f'Record "{post_data.title}" ({post_data.url}) marked as skipped because all it\'s enabled and valuable keywords {[k.name for k in enabled_and_valuable_matched_keywords]} are proprietary')
-                            state = DigestRecordState.SKIPPED.name
-                description = post_data.brief
-                cleared_description = BeautifulSoup(description, 'lxml').text if description else None
-                digest_record = DigestRecord(dt=post_data.dt,
-                                             source=source,
-                                             gather_dt=datetime.datetime.now(tz=dateutil.tz.tzlocal()),
-                                             title=post_data.title.strip(),
-                                             url=post_data.url,
-                                             state=state,
-                                             language=source.language,
-                                             description=description,
-                                             cleared_description=cleared_description)
-                digest_record.save()
-                digest_record.projects.set(source.projects.all())
-                if all_matched_keywords:
-                    digest_record.title_keywords.set(all_matched_keywords)
-                digest_record.save()
-                if digest_record.language == Language.ENGLISH.name:
-                    if cleared_description:
-                        self._save_lemmas(digest_record, cleared_description)
-                    else:
-                        custom_logger.debug(f'Skipped parsing lemmas for "{digest_record.title}" because cleared description is empty')
+            custom_logger.debug(f'Adding {short_post_data_str} to database')
+            all_matched_keywords = []
+            for keyword_name in post_data.keywords:
+                matched_keywords_for_one = index.by_name.get(keyword_name, [])
+                if len(matched_keywords_for_one) == 0:
+                    custom_logger.error(f'Failed to find keywords with name "{keyword_name}" in database')
                 else:
-                    custom_logger.debug(f'Skipped parsing lemmas for "{digest_record.title}" because it is not english')
-                added_digest_records_count += 1
-                custom_logger.debug(f'Added {short_post_data_str} to database')
+                    if len(matched_keywords_for_one) > 1:
+                        custom_logger.warning(f'More than one keyword with name "{keyword_name}" found in database')
+                    all_matched_keywords += matched_keywords_for_one
+            state = self._estimate_state(post_data, all_matched_keywords, posts_data_one.filters)
+            description = post_data.brief
+            cleared_description = BeautifulSoup(description, 'lxml').text if description else None
+            digest_record = DigestRecord(dt=post_data.dt,
+                                         source=source,
+                                         gather_dt=gather_dt,
+                                         title=post_data.title.strip(),
+                                         url=post_data.url,
+                                         state=state,
+                                         language=source.language,
+                                         description=description,
+                                         cleared_description=cleared_description)
+            similar_records_by_url[post_data.url] = digest_record
+            digest_records_to_add.append((digest_record, all_matched_keywords))
+        for url, dt in outdated_posts_dts_by_url.items():
+            missing_dts_by_url.setdefault(url, dt)
+        with transaction.atomic():
+            dt_updated_urls = backfill_digest_records_dates(missing_dts_by_url)
+            DigestRecord.objects.bulk_create([digest_record for digest_record, _ in digest_records_to_add])
+            DigestRecord.projects.through.objects.bulk_create([
+                DigestRecord.projects.through(digestrecord_id=digest_record.pk, project_id=project.pk)
+                for digest_record, _ in digest_records_to_add
+                for project in source_projects
+            ])
+            DigestRecord.title_keywords.through.objects.bulk_create([
+                DigestRecord.title_keywords.through(digestrecord_id=digest_record.pk, keyword_id=keyword_id)
+                for digest_record, all_matched_keywords in digest_records_to_add
+                for keyword_id in {keyword.pk for keyword in all_matched_keywords}
+            ])
+            # Lemmas are extracted by `indexlemmas` worker to not slow down gathering
+            enqueue_digest_records_lemmas_indexing(digest_record.pk
+                                                   for digest_record, _ in digest_records_to_add
+                                                   if digest_record.language == Language.ENGLISH.name
+                                                   and digest_record.cleared_description)
+        for url in dt_updated_urls:
+            custom_logger.debug(f'{url} already exists in database, but without date, fixed')
+        for digest_record, _ in digest_records_to_add:
+            custom_logger.debug(f'Added {digest_record.dt} "{digest_record.title}" ({digest_record.url}) to database')
+        added_digest_records_count = len(digest_records_to_add)
         iteration.saved_count = added_digest_records_count
         iteration.save()
-        custom_logger.info(f'Finished saving to database for source "{posts_data_one.source_name}", added {added_digest_records_count} digest record(s), {already_existing_digest_records_count} already existed, dates filled for {already_existing_digest_records_dt_updated_count} existing record(s)')
+        custom_logger.info(f'Finished saving to database for source "{posts_data_one.source_name}", added {added_digest_records_count} digest record(s), {already_existing_digest_records_count} already existed, dates filled for {len(dt_updated_urls)} existing record(s)')
 
-    def _save_lemmas(self, digest_record, cleared_description):
-        words = nltk.word_tokenize(cleared_description)
-        word_lemmas_counts = {}
-        for word in words:
-            word_lemmas = lemminflect.getAllLemmas(word)
-            lemmas_keys = ('NOUN', 'VERB', 'AUX', 'ADV', 'ADJ')
-            word_lemmas_plain = []
-            for lk in lemmas_keys:
-                if lk in word_lemmas:
-                    word_lemmas_plain += (l.lower() for l in word_lemmas[lk])
-            if not word_lemmas and re.match(r'\w', word):
-                word_lemmas_plain.append(word.lower())
-            for l in word_lemmas_plain:
-                if l not in word_lemmas_counts:
-                    word_lemmas_counts[l] = 1
-                else:
-                    word_lemmas_counts[l] += 1
-        for lemma_text, lemma_count_in_dr in word_lemmas_counts.items():
-            existing_lemmas = Lemma.objects.filter(text=lemma_text)
-            if not existing_lemmas:
-                lemma_object = Lemma(text=lemma_text)
-                lemma_object.save()
+    @staticmethod
+    def _estimate_state(post_data: PostData, all_matched_keywords: List[Keyword], filters: List[FiltrationType]):
+        if post_data.filtered:
+            return DigestRecordState.FILTERED.name
+        state = DigestRecordState.UNKNOWN.name
+        if all_matched_keywords:
+            enabled_and_valuable_matched_keywords = []
+            if not filters:
+                for keyword in all_matched_keywords:
+                    if keyword.enabled:
+                        enabled_and_valuable_matched_keywords.append(keyword)
+                should_be_skipped = False
+            elif FiltrationType.SPECIFIC in filters \
+                    and FiltrationType.GENERIC in filters:
+                should_be_skipped = True
+                for keyword in all_matched_keywords:
+                    if keyword.enabled:
+                        enabled_and_valuable_matched_keywords.append(keyword)
+            elif FiltrationType.SPECIFIC in filters:
+                should_be_skipped = True
+                for keyword in all_matched_keywords:
+                    if keyword.enabled and not keyword.is_generic:
+                        enabled_and_valuable_matched_keywords.append(keyword)
             else:
-                lemma_object = existing_lemmas[0]
-            existing_digest_record_lemmas = DigestRecordLemma.objects.filter(lemma=lemma_object,
-                                                                             digest_record=digest_record)
-            if not existing_digest_record_lemmas:
-                digest_record_lemma = DigestRecordLemma(lemma=lemma_object,
-                                                        digest_record=digest_record,
-                                                        count=lemma_count_in_dr)
-                digest_record_lemma.save()
+                should_be_skipped = True
+                for keyword in all_matched_keywords:
+                    if keyword.enabled and keyword.is_generic:
+                        enabled_and_valuable_matched_keywords.append(keyword)
+            if enabled_and_valuable_matched_keywords:
+                should_be_skipped = False
+            if should_be_skipped:
+                custom_logger.warning(f'Record "{post_data.title}" ({post_data.url}) marked as skipped after keywords check')
+                state = DigestRecordState.SKIPPED.name
+            else:
+                all_proprietary = True
+                for keyword in enabled_and_valuable_matched_keywords:
+                    if not keyword.proprietary:
+                        all_proprietary = False
+                        break
+                if all_proprietary and enabled_and_valuable_matched_keywords:
+                    custom_logger.warning(f'Record "{post_data.title}" ({post_data.url}) marked as skipped because all it\'s enabled and valuable keywords {[k.name for k in enabled_and_valuable_matched_keywords]} are proprietary')
+                    state = DigestRecordState.SKIPPED.name
+        return state
 
     def _init_globals(self, **options):
         if options['debug']:
             custom_logger.console_handler.setLevel(logging.DEBUG)
         global days_count
         days_count = options['DAYS_COUNT']
+        if options['workers'] < 1:
+            custom_logger.error('Workers count should be positive')
+            sys.exit(1)
+        if options['max_per_host'] < 1:
+            custom_logger.error('Max workers count per host should be positive')
+            sys.exit(1)
+        global workers_count
+        workers_count = options['workers']
+        global max_workers_per_host
+        max_workers_per_host = options['max_per_host']
+        global force_fetching
+        force_fetching = options['force']
+        if options['http_timeout'] <= 0:
+            custom_logger.error('HTTP timeout should be positive')
+            sys.exit(1)
+        if options['http_retries'] < 0:
+            custom_logger.error('HTTP retries count should not be negative')
+            sys.exit(1)
+        global http_timeout
+        http_timeout = options['http_timeout']
+        global http_retries_count
+        http_retries_count = options['http_retries']
         module = options['MODULE']
         global parsing_modules_names
         projects = Project.objects.values_list('name', flat=True)
@@ -258,7 +369,45 @@ class Command(BaseCommand):
                 enabled_sources_selected_by_user.append(source)
             else:
                 custom_logger.warning(f'Source "{source.name}" is disabled, not parsing')
-        parsing_modules_names = [s.name for s in enabled_sources_selected_by_user]
+        if options['schedule']:
+            sources_to_gather = sources_due(enabled_sources_selected_by_user, datetime.datetime.now(tz=dateutil.tz.tzlocal()))
+            custom_logger.info(f'{len(sources_to_gather)}/{len(enabled_sources_selected_by_user)} source(s) are due for gathering')
+        else:
+            sources_to_gather = enabled_sources_selected_by_user
+        parsing_modules_names = [s.name for s in sources_to_gather]
+
+
+class HostsScheduler:
+    # Queue of sources per host, hosts are taken in turn, so sources of one host do not occupy all workers
+
+    def __init__(self, parsing_modules: List[BasicParsingModule], max_per_host: int):
+        self._max_per_host = max_per_host
+        self._queues = {}
+        self._running_counts = {}
+        self._hosts = {}
+        for parsing_module in parsing_modules:
+            data_url = parsing_module.data_url
+            host = urlparse(data_url).netloc if data_url else None
+            self._queues.setdefault(host, deque()).append(parsing_module)
+            self._running_counts[host] = 0
+            self._hosts[parsing_module] = host
+
+    def next_parsing_modules(self, count: int) -> List[BasicParsingModule]:
+        parsing_modules = []
+        scheduled = True
+        while scheduled and len(parsing_modules) < count:
+            scheduled = False
+            for host, queue in self._queues.items():
+                if len(parsing_modules) >= count:
+                    break
+                if queue and self._running_counts[host] < self._max_per_host:
+                    parsing_modules.append(queue.popleft())
+                    self._running_counts[host] += 1
+                    scheduled = True
+        return parsing_modules
+
+    def finish(self, parsing_module: BasicParsingModule):
+        self._running_counts[self._hosts[parsing_module]] -= 1
 
 
 class ParsingModuleFactory:
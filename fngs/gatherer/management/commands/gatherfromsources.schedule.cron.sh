@@ -0,0 +1,10 @@
+#!/usr/bin/env bash
+# Add "*/5 * * * * /ABSOLUTE_PATH_TO_SCRIPT/gatherfromsources.schedule.cron.sh" to your crontab
+# instead of "gatherfromsources.cron.sh", each source is gathered only when it is due
+
+SCRIPT_DIRECTORY="$( cd "$( dirname "${BASH_SOURCE[0]}" )" >/dev/null 2>&1 && pwd )"
+cd "$SCRIPT_DIRECTORY/../../../../"
+source env/bin/activate
+cd fngs
+# Skip run if previous one is still in progress
+flock -n /tmp/fngs-gatherfromsources-schedule.lock python3 manage.py gatherfromsources --debug --schedule ALL 7
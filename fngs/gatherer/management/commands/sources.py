@@ -1,20 +1,32 @@
 import requests
 from urllib.parse import urlparse
 from bs4 import BeautifulSoup
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 from abc import ABCMeta, abstractmethod
-import xml.etree.ElementTree as ET
-from lxml import html
-import requests
+from lxml import (
+    etree,
+    html,
+)
 import re
 from pprint import pprint
 import traceback
 import datetime
 import dateutil
-from copy import copy
-import pytz
 
 from gatherer.models import *
+from gatherer.keywordsindex import keywords_index
+from gatherer.httpclient import (
+    HttpClient,
+    http_client,
+)
+from gatherer.dateparsing import parse_feed_datetime
+from gatherer.feedparsing import (
+    DEFAULT_MAX_FEED_SIZE_BYTES,
+    FeedReader,
+    FeedTooLargeException,
+    iterparse_feed_items,
+    response_charset,
+)
 
 
 foss_news_project = Project.objects.get(name='FOSS News')
@@ -32,6 +44,8 @@ def shorten_text(s: str, max_length: int = 20):
 
 
 class PostData:
+    # Posts are created for each item of each feed, slots make them smaller
+    __slots__ = ('dt', 'title', 'url', 'brief', 'keywords', 'filtered')
 
     def __init__(self,
                  dt: datetime.datetime,
@@ -44,7 +58,7 @@ class PostData:
         self.url = url
         self.brief = brief
         self.keywords = []
-        self.filtered = None
+        self.filtered = filtered
 
     def __str__(self):
         return f'{self.dt} -- {self.url} -- {self.title} -- {shorten_text(self.brief)}'
@@ -74,24 +88,54 @@ class FiltrationType(Enum):
 
 class ParsingResult:
 
-    def __init__(self, overall_count, posts_data_after_filtration, source_enabled, source_error, parser_error):
+    def __init__(self, overall_count, posts_data_after_filtration, source_enabled, source_error, parser_error,
+                 source_unchanged=False, etag=None, last_modified=None,
+                 watermark_url=None, watermark_dt=None, data_hash=None, outdated_posts_dts_by_url=None):
         self.overall_count = overall_count
         self.posts_data_after_filtration: List[PostData] or None = posts_data_after_filtration
         self.source_enabled: bool = source_enabled
         self.source_error: str or None = source_error
         self.parser_error: str or None = parser_error
+        self.source_unchanged: bool = source_unchanged
+        # Validators are saved to source only after posts are saved, so failed saving does not hide posts next time
+        self.etag: str or None = etag
+        self.last_modified: str or None = last_modified
+        self.watermark_url: str or None = watermark_url
+        self.watermark_dt: datetime.datetime or None = watermark_dt
+        self.data_hash: str or None = data_hash
+        # Dates of already saved records are filled from outdated posts by the same thread which saves posts
+        self.outdated_posts_dts_by_url: Dict[str, datetime.datetime] = outdated_posts_dts_by_url or {}
 
     @property
     def success(self):
         return not(self.source_error or self.parser_error)
 
 
+class PostsDataCounter:
+    # Counts posts passed through lazy pipeline
+
+    def __init__(self, posts_data: Iterable[PostData]):
+        self.posts_data = posts_data
+        self.count = 0
+
+    def __iter__(self) -> Iterator[PostData]:
+        for post_data in self.posts_data:
+            self.count += 1
+            yield post_data
+
+
 class DigestSourceException(Exception):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
 
+class DigestSourceNotModifiedException(Exception):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+
 class BasicParsingModule(metaclass=ABCMeta):
 
     data_url = None
@@ -100,9 +144,17 @@ class BasicParsingModule(metaclass=ABCMeta):
     filtration_needed = False
     filters = []
     language: Language = None
+    conditional_fetching_enabled = True
+    http_client: HttpClient = http_client
 
     def __init__(self, logger):
         self.logger = logger
+        self.etag = None
+        self.last_modified = None
+        self.watermark_url = None
+        self.watermark_dt = None
+        self.data_hash = None
+        self.outdated_posts_dts_by_url = {}
 
     @property
     def source_name(self):
@@ -119,8 +171,13 @@ class BasicParsingModule(metaclass=ABCMeta):
         if not DigestRecordsSource.objects.get(name=self.source_name).enabled:  # TODO: Check existence
             self.logger.warning(f'"{self.source_name}" is disabled')
             return ParsingResult(0, [], False, None, None)
+        # Posts are parsed, filtered and processed one by one, only posts left after filtration are kept
+        posts_data = PostsDataCounter(self._parse())
         try:
-            posts_data: List[PostData] = self._parse()
+            filtered_posts_data: List[PostData] = list(self._fill_keywords(self._filter_out(posts_data, days_count)))
+        except DigestSourceNotModifiedException:
+            self.logger.info(f'"{self.source_name}" not modified since previous fetching, skip parsing')
+            return ParsingResult(0, [], True, None, None, source_unchanged=True)
         except DigestSourceException as e:
             self.logger.error(f'Failed to parse "{self.source_name}", source error: {str(e)}')
             return ParsingResult(0, [], True, str(e), None)
@@ -128,22 +185,23 @@ class BasicParsingModule(metaclass=ABCMeta):
             self.logger.error(f'Failed to parse "{self.source_name}", parser error: {str(e)}')
             self.logger.error(traceback.format_exc())
             return ParsingResult(0, [], True, None, str(e))
-        try:
-            filtered_posts_data: List[PostData] = self._filter_out(posts_data, days_count)
-            self._fill_keywords(filtered_posts_data)
-            return ParsingResult(len(posts_data), filtered_posts_data, True, None, None)
-        except Exception as e:
-            self.logger.error(f'Failed to filter data parsed from "{self.source_name}" source: {str(e)}')
-            self.logger.error(traceback.format_exc())
-            return ParsingResult(0, [], True, None, str(e))
+        return ParsingResult(posts_data.count, filtered_posts_data, True, None, None,
+                             etag=self.etag, last_modified=self.last_modified,
+                             watermark_url=self.watermark_url, watermark_dt=self.watermark_dt,
+                             data_hash=self.data_hash, outdated_posts_dts_by_url=self.outdated_posts_dts_by_url)
 
     @abstractmethod
-    def _parse(self) -> List[PostData]:
+    def _parse(self) -> Iterable[PostData]:
         pass
 
+    def _fetch(self, url, headers=None, stream=False) -> requests.Response:
+        try:
+            return self.http_client.get(url, headers=headers, logger=self.logger, stream=stream)
+        except requests.RequestException as e:
+            raise DigestSourceException(f'Failed to fetch {url}: {str(e)}')
+
     def fetch_tag_from_url_by_selector(self, url, container_tag, container_selector):
-        # TODO: Add retries and handle errors
-        response = requests.get(url, timeout=30)
+        response = self._fetch(url)
         html = response.content
         parser = BeautifulSoup(html, 'html.parser')
         content = parser.find(container_tag, container_selector)
@@ -153,78 +211,53 @@ class BasicParsingModule(metaclass=ABCMeta):
     def fetch_url(self, url):
         return None
 
-    def _fill_keywords(self, posts_data: List[PostData]):
-        keywords_to_check = []
-        keywords_to_check += [k.name for k in Keyword.objects.all()]
+    def _fill_keywords(self, posts_data: Iterable[PostData]) -> Iterator[PostData]:
+        keywords_matcher = keywords_index().matcher
         for post_data in posts_data:
-            for keyword in keywords_to_check:
-                if keyword in post_data.keywords:
-                    continue
-                if BasicParsingModule.find_keyword_in_title(keyword, post_data.title):
+            for keyword in keywords_matcher.find(post_data.title):
+                if keyword not in post_data.keywords:
                     post_data.keywords.append(keyword)
-
-    @staticmethod
-    def find_keyword_in_title(keyword, title):
-        return re.search(rf'\b{re.escape(keyword)}\b', title, re.IGNORECASE)
-
-    def _filter_out(self, source_posts_data: List[PostData], days_count: int):
-        actual_posts_data = self._filter_out_old(source_posts_data, days_count)
-        outdated_len = len(source_posts_data) - len(actual_posts_data)
+            yield post_data
+
+    def _filter_out(self, source_posts_data: Iterable[PostData], days_count: int) -> Iterator[PostData]:
+        source_posts_data = PostsDataCounter(source_posts_data)
+        actual_posts_data = PostsDataCounter(self._filter_out_old(source_posts_data, days_count))
+        filtered_posts_data = PostsDataCounter(self._filter_out_by_keywords(actual_posts_data))
+        yield from filtered_posts_data
+        outdated_len = source_posts_data.count - actual_posts_data.count
         if outdated_len:
-            self.logger.info(f'{len(source_posts_data) - len(actual_posts_data)}/{len(source_posts_data)} posts ignored for "{self.source_name}" as too old')
-        filtered_posts_data = self._filter_out_by_keywords(actual_posts_data)
-        nonactual_len = len(actual_posts_data) - len(filtered_posts_data)
+            self.logger.info(f'{outdated_len}/{source_posts_data.count} posts ignored for "{self.source_name}" as too old')
+        nonactual_len = actual_posts_data.count - filtered_posts_data.count
         if nonactual_len:
-            self.logger.info(f'{len(source_posts_data) - len(actual_posts_data)}/{len(source_posts_data)} posts ignored for "{self.source_name}" as not passed keywords filters')
-        return filtered_posts_data
+            self.logger.info(f'{nonactual_len}/{source_posts_data.count} posts ignored for "{self.source_name}" as not passed keywords filters')
 
-    def _filter_out_by_keywords(self, posts_data: List[PostData]):
+    def _filter_out_by_keywords(self, posts_data: Iterable[PostData]) -> Iterator[PostData]:
         if not self.filtration_needed:
-            return posts_data
-        filtered_posts_data: List[PostData] = []
-        keywords_to_check = []
-        if FiltrationType.GENERIC in self.filters:
-            keywords_to_check += [k.name for k in Keyword.objects.filter(is_generic=True, proprietary=False)]
-        if FiltrationType.SPECIFIC in self.filters:
-            keywords_to_check += [k.name for k in Keyword.objects.filter(is_generic=False, proprietary=False)]
+            yield from posts_data
+            return
+        keywords_matcher = keywords_index().filtration_matcher(generic=FiltrationType.GENERIC in self.filters,
+                                                               specific=FiltrationType.SPECIFIC in self.filters)
         for post_data in posts_data:
             if not post_data.title:
                 self.logger.error(f'Empty title for URL {post_data.url}')
                 continue
-            matched = False
-            for keyword in keywords_to_check:
-                if BasicParsingModule.find_keyword_in_title(keyword, post_data.title):
-                    matched = True
-                    break
-            processed_post_data = copy(post_data)
-            if matched:
+            if keywords_matcher.matches(post_data.title):
                 self.logger.debug(f'"{post_data.title}" from "{self.source_name}" added because it contains keywords {post_data.keywords}')
-                processed_post_data.filtered = False
+                post_data.filtered = False
             else:
                 self.logger.warning(f'"{post_data.title}" ({post_data.url}) from "{self.source_name}" filtered out cause not contains none of expected keywords')
-                processed_post_data.filtered = True
-            filtered_posts_data.append(processed_post_data)
-        return filtered_posts_data
+                post_data.filtered = True
+            yield post_data
 
-    def _filter_out_old(self, posts_data: List[PostData], days_count: int) -> List[PostData]:
-        filtered_posts_data: List[PostData] = []
+    def _filter_out_old(self, posts_data: Iterable[PostData], days_count: int) -> Iterator[PostData]:
         dt_now = datetime.datetime.now(tz=dateutil.tz.tzlocal())
-        already_existing_digest_records_dt_updated_count = 0
+        self.outdated_posts_dts_by_url = {}
         for post_data in posts_data:
             if post_data.dt is not None and (dt_now - post_data.dt).days > days_count:
                 self.logger.debug(f'"{post_data.title}" from "{self.source_name}" filtered as too old ({post_data.dt})')
-                similar_records = DigestRecord.objects.filter(url=post_data.url)  # TODO: Replace check for similar records before and with "get"
-                if similar_records:
-                    if not similar_records[0].dt:
-                        similar_records[0].dt = post_data.dt
-                        self.logger.debug(f'{post_data.url} already exists in database, but without date, fix it')
-                        already_existing_digest_records_dt_updated_count += 1
-                        similar_records[0].save()
+                self.outdated_posts_dts_by_url.setdefault(post_data.url, post_data.dt)
             else:
-                filtered_posts_data.append(post_data)
-        if already_existing_digest_records_dt_updated_count:
-            self.logger.info(f'Few outdated sources found in database without dates, fixed for {already_existing_digest_records_dt_updated_count} sources')
-        return filtered_posts_data
+                yield post_data
 
 
 class RssBasicParsingModule(BasicParsingModule):
@@ -235,62 +268,128 @@ class RssBasicParsingModule(BasicParsingModule):
     link_tag_name = None
     description_tag_name = None
     no_description = False
+    max_feed_size = DEFAULT_MAX_FEED_SIZE_BYTES
 
     def __init__(self, logger):
         self.rss_data_root = None
+        self._tags_fields = {}
         super().__init__(logger)
 
-    def _preprocess_xml(self, text: str):
-        return text
-
     def _preprocess_date_str(self, date_str: str):
         return date_str
 
-    def _parse(self):
-        posts_data: List[PostData] = []
-        response = requests.get(self.data_url,
-                                headers={'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.114 Safari/537.36'})
-        if response.status_code != 200:
-            raise DigestSourceException(f'"{self.source_name}" returned status code {response.status_code}')
+    @staticmethod
+    def _conditional_headers(source: DigestRecordsSource or None):
+        if source is None:
+            return {}
+        headers = {}
+        if source.etag:
+            headers['If-None-Match'] = source.etag
+        if source.last_modified:
+            headers['If-Modified-Since'] = source.last_modified
+        return headers
+
+    def _tag_field(self, tag: str):
+        # Item subelements tags are matched by substrings once per feed, the same tags are repeated in all items
+        field = self._tags_fields.get(tag)
+        if field is None:
+            field = ''
+            for field_name, tag_name in (('title', self.title_tag_name),
+                                         ('pubdate', self.pubdate_tag_name),
+                                         ('link', self.link_tag_name),
+                                         ('description', self.description_tag_name),
+                                         ('group', 'group')):
+                if tag_name in tag:
+                    field = field_name
+                    break
+            self._tags_fields[tag] = field
+        return field
+
+    @staticmethod
+    def _watermark_reached(source: DigestRecordsSource, url: str, dt: datetime.datetime or None, previous_dt: datetime.datetime or None):
+        if source.watermark_url is not None and url == source.watermark_url:
+            return True
+        # Newest post parsed before could be removed from feed, older posts are trusted only after newer ones,
+        # otherwise feed could be just ordered from oldest posts now
+        return dt is not None and previous_dt is not None and source.watermark_dt is not None and dt < source.watermark_dt
+
+    def _update_watermark(self, source: DigestRecordsSource or None, newest_url: str or None, newest_dt: datetime.datetime or None, ordered_from_newest: bool):
+        if newest_url is None:
+            if source is not None:
+                self.watermark_url = source.watermark_url
+                self.watermark_dt = source.watermark_dt
+            return
+        if ordered_from_newest:
+            self.watermark_url = newest_url
+            self.watermark_dt = newest_dt
         else:
-            self.logger.debug(f'Successfully fetched RSS for "{self.source_name}"')
-        self.rss_data_root = ET.fromstring(self._preprocess_xml(response.text))
-        no_description_at_all = True
-        for rss_data_elem in self.rss_items_root():
-            if self.item_tag_name in rss_data_elem.tag:
+            self.watermark_url = None
+            self.watermark_dt = None
+
+    def _items_root(self, root):
+        self.rss_data_root = root
+        return self.rss_items_root()
+
+    def _parse(self):
+        # Source keeps state of previous fetching, it is ignored when fetching is forced
+        source = DigestRecordsSource.objects.get(name=self.source_name) if self.conditional_fetching_enabled else None
+        response = self._fetch(self.data_url, headers=self._conditional_headers(source), stream=True)
+        spooled_feed_file = None
+        try:
+            if response.status_code == 304:
+                raise DigestSourceNotModifiedException(f'"{self.source_name}" not modified')
+            elif response.status_code != 200:
+                raise DigestSourceException(f'"{self.source_name}" returned status code {response.status_code}')
+            else:
+                self.logger.debug(f'Successfully fetched RSS for "{self.source_name}"')
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+            no_description_at_all = True
+            watermark_reached = False
+            # Posts could be changed by subclasses after they are yielded, so URL is kept as it was parsed
+            newest_url = None
+            newest_dt = None
+            previous_dt = None
+            # Parsing could be stopped on watermark only for feeds ordered from newest posts
+            ordered_from_newest = True
+            feed_reader = FeedReader(response, self.max_feed_size)
+            if source is not None and source.data_hash is not None:
+                # Feed is read fully before parsing to not parse it at all if it is not changed
+                spooled_feed_file = feed_reader.spool()
+                if feed_reader.hexdigest() == source.data_hash:
+                    raise DigestSourceNotModifiedException(f'"{self.source_name}" data not changed')
+            items = iterparse_feed_items(spooled_feed_file or feed_reader,
+                                         self.item_tag_name,
+                                         self._items_root,
+                                         encoding=response_charset(response))
+            for rss_data_elem in items:
                 dt = None
                 title = None
                 url = None
                 brief = None
-                for rss_data_subelem in rss_data_elem:
-                    tag = rss_data_subelem.tag
+                for rss_data_subelem in rss_data_elem.iterchildren(tag=etree.Element):
+                    tag_field = self._tag_field(rss_data_subelem.tag)
                     text = rss_data_subelem.text
-                    if self.title_tag_name in tag:
+                    if tag_field == 'title':
                         if not text:
                             continue
                         title = text.strip()
-                    elif self.pubdate_tag_name in tag:
-                        text = self._preprocess_date_str(text)
-                        text = self._date_from_russian_to_english(text) # TODO: Extract such filter to specific classes
-                        dt: datetime.datetime = dateutil.parser.parse(text)
-                        if dt.tzinfo is None:
-                            dt = dt.replace(tzinfo=pytz.UTC)
-                    elif self.link_tag_name in tag:
+                    elif tag_field == 'pubdate':
+                        dt: datetime.datetime = parse_feed_datetime(self._preprocess_date_str(text))
+                    elif tag_field == 'link':
                         if text:
                             url = text
                         elif 'href' in rss_data_subelem.attrib:
                             url = rss_data_subelem.attrib['href']
                         else:
                             self.logger.error(f'Could not find URL for "{title}" feed record')
-                    elif self.description_tag_name in tag:
+                    elif tag_field == 'description':
                         brief = text
                         no_description_at_all = False
-                    elif 'group' in tag:
-                        for rss_data_subsubelem in rss_data_subelem:
-                            subtag = rss_data_subsubelem.tag
-                            if self.description_tag_name in subtag:
-                                subtext = rss_data_subsubelem.text
-                                brief = subtext
+                    elif tag_field == 'group':
+                        for rss_data_subsubelem in rss_data_subelem.iterchildren(tag=etree.Element):
+                            if self.description_tag_name in rss_data_subsubelem.tag:
+                                brief = rss_data_subsubelem.text
                                 no_description_at_all = False
                 url = self.process_url(url)
                 if not url:
@@ -299,43 +398,51 @@ class RssBasicParsingModule(BasicParsingModule):
                     else:
                         self.logger.error(f'Empty URL and empty title for source "{self.source_name}"')
                     continue
-                post_data = PostData(dt, title, url, brief)
-                posts_data.append(post_data)
-        if posts_data and no_description_at_all and not self.no_description:
+                if source is not None and ordered_from_newest and self._watermark_reached(source, url, dt, previous_dt):
+                    watermark_reached = True
+                    if url == source.watermark_url:
+                        dt = source.watermark_dt
+                if dt is None or (previous_dt is not None and dt > previous_dt):
+                    # Watermark says nothing about the rest of posts of not ordered feed, it is parsed fully
+                    ordered_from_newest = False
+                    watermark_reached = False
+                previous_dt = dt
+                if watermark_reached:
+                    # Feed is ordered from newest posts, so the rest of posts were parsed before
+                    self.logger.debug(f'Reached newest post parsed before for "{self.source_name}", skip the rest')
+                    break
+                if newest_url is None:
+                    newest_url = url
+                    newest_dt = dt
+                yield PostData(dt, title, url, brief)
+            items.close()
+            self.data_hash = feed_reader.hexdigest()
+        except FeedTooLargeException as e:
+            raise DigestSourceException(f'"{self.source_name}" feed is too large: {str(e)}')
+        except requests.RequestException as e:
+            raise DigestSourceException(f'Failed to read {self.data_url}: {str(e)}')
+        finally:
+            if spooled_feed_file is not None:
+                spooled_feed_file.close()
+            response.close()
+        self._update_watermark(source, newest_url, newest_dt, ordered_from_newest)
+        if newest_url is not None and no_description_at_all and not self.no_description and not watermark_reached:
             self.logger.error(f'No descriptions at all in {self.source_name} source feed')
-        return posts_data
-
-    def _date_from_russian_to_english(self,
-                                      datetime_text: str):
-        days_map = {
-            'Пн': 'Mon',
-            'Вт': 'Tue',
-            'Ср': 'Wed',
-            'Чт': 'Thu',
-            'Пт': 'Fri',
-            'Сб': 'Sat',
-            'Вс': 'Sun',
-        }
-        months_map = {
-            'янв': 'jan',
-            'фев': 'feb',
-            'мар': 'mar',
-            'апр': 'apr',
-            'май': 'may',
-            'мая': 'may',
-            'июн': 'jun',
-            'июл': 'jul',
-            'авг': 'aug',
-            'сен': 'sep',
-            'окт': 'oct',
-            'ноя': 'nov',
-            'дек': 'dec',
-        }
-        converted_datetime_text = datetime_text
-        for ru_en_map in (days_map, months_map):
-            for ru, en in ru_en_map.items():
-                converted_datetime_text = converted_datetime_text.replace(ru, en)
-        return converted_datetime_text
+
+    def fetch_dates_strs(self) -> Iterator[str]:
+        # Dates of feed items as they are passed to dates parsing, used for benchmarking
+        response = self._fetch(self.data_url, stream=True)
+        try:
+            items = iterparse_feed_items(FeedReader(response, self.max_feed_size),
+                                         self.item_tag_name,
+                                         self._items_root,
+                                         encoding=response_charset(response))
+            for rss_data_elem in items:
+                for rss_data_subelem in rss_data_elem.iterchildren(tag=etree.Element):
+                    if self._tag_field(rss_data_subelem.tag) == 'pubdate' and rss_data_subelem.text:
+                        yield self._preprocess_date_str(rss_data_subelem.text)
+        finally:
+            response.close()
 
     def process_url(self, url):
         return url
@@ -576,21 +683,19 @@ class HabrComNewsParsingModule(HabrComBasicParsingModule):
 
 class FilterFossNewsItselfMixin:
 
-    def filter_foss_news_itself(self, posts_data: List[PostData]):
+    def filter_foss_news_itself(self, posts_data: Iterable[PostData]) -> Iterator[PostData]:
         for post_data in posts_data:
             if re.fullmatch(FOSS_NEWS_REGEXP, post_data.title):
                 self.logger.warning(f'Filtered "{post_data.title}" as it is our digest itself')
                 post_data.filtered = True
-        return posts_data
+            yield post_data
 
 
 class HabrComOpenSourceParsingModule(HabrComBasicParsingModule,
                                      FilterFossNewsItselfMixin):
 
     def _parse(self):
-        posts_data: List[PostData] = super()._parse()
-        filtered_posts_data = self.filter_foss_news_itself(posts_data)
-        return filtered_posts_data
+        return self.filter_foss_news_itself(super()._parse())
 
 
 class HabrComLinuxParsingModule(HabrComBasicParsingModule):
@@ -605,9 +710,7 @@ class HabrComNixParsingModule(HabrComBasicParsingModule,
                               FilterFossNewsItselfMixin):
 
     def _parse(self):
-        posts_data: List[PostData] = super()._parse()
-        filtered_posts_data = self.filter_foss_news_itself(posts_data)
-        return filtered_posts_data
+        return self.filter_foss_news_itself(super()._parse())
 
 
 class HabrComDevOpsParsingModule(HabrComBasicParsingModule):
@@ -692,7 +795,7 @@ class PingvinusRuParsingModule(BasicParsingModule):
         self.news_page_url = f'{self.data_url}/news'
 
     def _parse(self):
-        response = requests.get(self.news_page_url)
+        response = self._fetch(self.news_page_url)
         if response.status_code != 200:
             raise DigestSourceException(f'"{self.source_name}" returned status code {response.status_code}')
         tree = html.fromstring(response.content)
@@ -704,16 +807,13 @@ class PingvinusRuParsingModule(BasicParsingModule):
         titles_texts = [title_block.text for title_block in titles_blocks]
         dates_texts = [date_block.text for date_block in dates_blocks]
         urls = [f'{self.data_url}{rel_url}' for rel_url in rel_urls]
-        posts = []
         for title, date_str, url in zip(titles_texts, dates_texts, urls):
             dt = datetime.datetime.strptime(date_str, '%d.%m.%Y')
             dt = dt.replace(tzinfo=dateutil.tz.gettz('Europe/Moscow'))
             if not title:
                 self.logger.error(f'Empty title for URL {url}')
                 continue
-            post_data = PostData(dt, title, url, None)
-            posts.append(post_data)
-        return posts
+            yield PostData(dt, title, url, None)
 
 
 class RedditRssBasicParsingModule(SimpleRssBasicParsingModule):
@@ -987,13 +1087,10 @@ class PodctlEnterpriseKubernetesParsingModule(SimpleRssBasicParsingModule):
 class IstioBlogAndNewsParsingModule(SimpleRssBasicParsingModule):
 
     def _parse(self):
-        posts_data: List[PostData] = super()._parse()
-        posts_data_with_fixed_urls = []
-        for p in posts_data:
+        for p in super()._parse():
             if not re.fullmatch(r'^https://.*', p.url):
                 p.url = f'https://istio.io{p.url}'
-            posts_data_with_fixed_urls.append(p)
-        return posts_data_with_fixed_urls
+            yield p
 
 
 class ProgrammingKubernetesParsingModule(SimpleRssBasicParsingModule):
@@ -1880,9 +1977,6 @@ class SecretgeekParsingModule(SimpleRssBasicParsingModule):
         FiltrationType.SPECIFIC,
     )
 
-    def _preprocess_xml(self, text: str):
-        return super()._preprocess_xml(text.replace('ï»¿', ''))
-
 
 class ShawnWildermuthSBlogParsingModule(SimpleRssBasicParsingModule):
 
@@ -1,27 +1,39 @@
 from django.core.management.base import BaseCommand
+from django.db import connections
 
 from gatherer.models import *
 
 import logging
+import multiprocessing
 import os
 import traceback
 import math
 import sys
 import datetime
+import time
 
 
 from .logger import Logger
 SCRIPT_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 custom_logger = Logger(os.path.join('keywordsupdate.log'))
-from .sources import BasicParsingModule
+from gatherer.keywordsindex import keywords_index
+from gatherer.keywordsretagging import (
+    DEFAULT_RETAGGING_CHUNK_SIZE,
+    iterate_digest_records_chunks,
+    match_titles,
+    retag_queued_keywords,
+    save_title_keywords_diff,
+)
 
 
 SCRIPT_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
 DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_PROCESSES_COUNT = 1
+DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS = 10
 
 
 class Command(BaseCommand):
-    help = 'Dump Digest Records data for Machine Learning tasks'
+    help = 'Update title keywords of all digest records'
 
     def add_arguments(self, parser):
         # TODO: Option to list available sources
@@ -29,43 +41,103 @@ class Command(BaseCommand):
                             '--debug',
                             action='store_true',
                             help='Debug mode')
+        parser.add_argument('-c',
+                            '--chunk-size',
+                            type=int,
+                            default=DEFAULT_RETAGGING_CHUNK_SIZE,
+                            help=f'Count of digest records processed at once, default - {DEFAULT_RETAGGING_CHUNK_SIZE}')
+        parser.add_argument('-p',
+                            '--processes',
+                            type=int,
+                            default=DEFAULT_PROCESSES_COUNT,
+                            help=f'Count of processes matching titles, default - {DEFAULT_PROCESSES_COUNT}')
+        parser.add_argument('-q',
+                            '--queue',
+                            action='store_true',
+                            help='Update only digest records affected by keywords changed since previous run')
+        parser.add_argument('-m',
+                            '--daemon',
+                            action='store_true',
+                            help='Keep polling queue of changed keywords, requires `--queue`')
+        parser.add_argument('-t',
+                            '--timeout',
+                            type=int,
+                            default=DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS,
+                            help=f'Queue polling timeout in seconds for daemon mode, default - {DEFAULT_QUEUE_POLLING_TIMEOUT_SECONDS}')
 
     def handle(self, *args, **options):
+        pool = None
         try:
             begin_dt = datetime.datetime.now()
             self._init_globals(**options)
             custom_logger.info(f'Saving log to "{custom_logger.file_path}"')
             custom_logger.info('Started updating keywords in digest records')
+            if options['chunk_size'] < 1 or options['processes'] < 1:
+                raise Exception('`--chunk-size` and `--processes` should be positive')
+            if options['daemon'] and not options['queue']:
+                raise Exception('`--daemon` argument is supported only with `--queue`')
+            if options['queue']:
+                if options['daemon']:
+                    while True:
+                        if not self._retag_queue(options):
+                            custom_logger.debug(f'Sleeping {options["timeout"]} second(s)')
+                            time.sleep(options['timeout'])
+                else:
+                    self._retag_queue(options)
+                return
+            index = keywords_index()
+            keywords_names_by_id = {k.id: k.name for k in index.keywords}
+            if options['processes'] > 1:
+                # Forked processes must not share database connections with main process,
+                # keywords index is built before fork to be reused by workers
+                connections.close_all()
+                pool = multiprocessing.Pool(options['processes'])
+                custom_logger.info(f'Using {options["processes"]} processes for matching titles')
             digest_records_queryset = DigestRecord.objects.all()
-            last_printed_percent = None
-            digest_record_object: DigestRecord
-            keywords_queryset = Keyword.objects.all()
+            digest_records_count = digest_records_queryset.count()
+            processed_digest_records_count = 0
             updated_digest_records_count = 0
-            for digest_record_object_i, digest_record_object in enumerate(digest_records_queryset):
-                # TODO: Optimize, too slow
-                title_keywords_to_save = []
-                for keyword in keywords_queryset:
-                    if BasicParsingModule.find_keyword_in_title(keyword.name, digest_record_object.title):
-                        title_keywords_to_save.append(keyword)
-                if set(title_keywords_to_save) != set(digest_record_object.title_keywords.all()):
-                    custom_logger.debug(f'Need to update keywords for digest record #{digest_record_object.id} "{digest_record_object.title}", old keywords were {sorted([k.name for k in digest_record_object.title_keywords.all()])}, new keywords are {sorted([k.name for k in title_keywords_to_save])}')
-                    digest_record_object.title_keywords.set(title_keywords_to_save)
-                    digest_record_object.save()
-                    custom_logger.debug('Updated')
-                    updated_digest_records_count += 1
-                percent = math.floor(digest_record_object_i / digest_records_queryset.count() * 100)
+            last_printed_percent = None
+            for chunk in iterate_digest_records_chunks(digest_records_queryset, options['chunk_size']):
+                titles = [title for _, title in chunk]
+                if pool is None:
+                    matched_keywords_ids = match_titles(titles)
+                else:
+                    sub_chunk_size = math.ceil(len(titles) / options['processes'])
+                    matched_keywords_ids = [keywords_ids
+                                            for sub_chunk_matched_keywords_ids in pool.map(match_titles,
+                                                                                           [titles[i:i + sub_chunk_size]
+                                                                                            for i in range(0, len(titles), sub_chunk_size)])
+                                            for keywords_ids in sub_chunk_matched_keywords_ids]
+                changes = save_title_keywords_diff({digest_record_id: keywords_ids
+                                                    for (digest_record_id, _), keywords_ids in zip(chunk, matched_keywords_ids)})
+                for digest_record_id, added_keywords_ids, removed_keywords_ids in changes:
+                    custom_logger.debug(f'Updated keywords for digest record #{digest_record_id}, added {sorted(keywords_names_by_id.get(i, str(i)) for i in added_keywords_ids)}, removed {sorted(keywords_names_by_id.get(i, str(i)) for i in removed_keywords_ids)}')
+                updated_digest_records_count += len(changes)
+                processed_digest_records_count += len(chunk)
+                percent = math.floor(processed_digest_records_count / digest_records_count * 100) if digest_records_count else 100
                 if last_printed_percent is None or percent != last_printed_percent:
                     custom_logger.info(f'Processed {percent}%')
                     last_printed_percent = percent
-            if last_printed_percent is not None and last_printed_percent != 100:
-                custom_logger.info(f'Processed 100%')
-            custom_logger.info(f'Finished updating keywords in digest records, updated {updated_digest_records_count}/{digest_records_queryset.count()} ({math.floor(updated_digest_records_count / digest_records_queryset.count() * 100)}%) digest records')
+            custom_logger.info(f'Finished updating keywords in digest records, updated {updated_digest_records_count}/{processed_digest_records_count} ({math.floor(updated_digest_records_count / processed_digest_records_count * 100) if processed_digest_records_count else 0}%) digest records')
             end_dt = datetime.datetime.now()
             custom_logger.info(f'Execution time: {end_dt - begin_dt}')
+        except KeyboardInterrupt:
+            custom_logger.info('Interrupted')
         except Exception as e:
             custom_logger.critical(e)
             custom_logger.critical(traceback.format_exc())
             sys.exit(1)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    @staticmethod
+    def _retag_queue(options) -> int:
+        updated_digest_records_counts = retag_queued_keywords(options['chunk_size'])
+        for keyword_id, updated_digest_records_count in updated_digest_records_counts.items():
+            custom_logger.info(f'Updated keywords for {updated_digest_records_count} digest record(s) affected by keyword #{keyword_id}')
+        return len(updated_digest_records_counts)
 
     def _init_globals(self, **options):
         if options['debug']:
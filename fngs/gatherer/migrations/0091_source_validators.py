@@ -0,0 +1,28 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0090_enable_fetching_for_some_sources'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digestgatheringiteration',
+            name='source_unchanged',
+            field=models.BooleanField(default=False, verbose_name='Source unchanged since previous iteration'),
+        ),
+        migrations.AddField(
+            model_name='digestrecordssource',
+            name='etag',
+            field=models.CharField(blank=True, max_length=1024, null=True, verbose_name='ETag of last fetched data'),
+        ),
+        migrations.AddField(
+            model_name='digestrecordssource',
+            name='last_modified',
+            field=models.CharField(blank=True, max_length=128, null=True, verbose_name='Last-Modified of last fetched data'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0091_source_validators'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='digestgatheringiteration',
+            index=models.Index(fields=['source', 'dt'], name='gatherer_di_source__1c34af_idx'),
+        ),
+    ]
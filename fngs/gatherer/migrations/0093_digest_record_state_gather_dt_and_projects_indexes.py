@@ -0,0 +1,24 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0092_digestgatheringiteration_source_dt_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='digestrecord',
+            index=models.Index(fields=['state', 'gather_dt'], name='gatherer_di_state_b5dffc_idx'),
+        ),
+        # Through table of projects has unique index on (digestrecord_id, project_id) only,
+        # so lookups of project records need reversed one
+        migrations.RunSQL(
+            'CREATE INDEX gatherer_digestrecord_projects_project_record_idx '
+            'ON gatherer_digestrecord_projects (project_id, digestrecord_id);',
+            'DROP INDEX gatherer_digestrecord_projects_project_record_idx;',
+        ),
+    ]
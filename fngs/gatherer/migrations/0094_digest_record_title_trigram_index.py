@@ -0,0 +1,19 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0093_digest_record_state_gather_dt_and_projects_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Case insensitive substring search of keywords in titles, used for incremental retagging
+        migrations.RunSQL(
+            'CREATE INDEX gatherer_digestrecord_title_trgm_idx '
+            'ON gatherer_digestrecord USING gin (UPPER(title) gin_trgm_ops);',
+            'DROP INDEX gatherer_digestrecord_title_trgm_idx;',
+        ),
+    ]
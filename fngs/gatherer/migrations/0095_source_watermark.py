@@ -0,0 +1,28 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0094_digest_record_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digestrecordssource',
+            name='data_hash',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='SHA-256 of last fetched data'),
+        ),
+        migrations.AddField(
+            model_name='digestrecordssource',
+            name='watermark_dt',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date of newest fetched post'),
+        ),
+        migrations.AddField(
+            model_name='digestrecordssource',
+            name='watermark_url',
+            field=models.CharField(blank=True, max_length=256, null=True, verbose_name='URL of newest fetched post'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0095_source_watermark'),
+    ]
+
+    operations = [
+        # Case insensitive substring search of links, used by search of already gathered links
+        migrations.RunSQL(
+            'CREATE INDEX gatherer_digestrecord_url_trgm_idx '
+            'ON gatherer_digestrecord USING gin (UPPER(url) gin_trgm_ops);',
+            'DROP INDEX gatherer_digestrecord_url_trgm_idx;',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.20 on 2026-10-18 08:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatherer', '0096_digest_record_url_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeywordRetaggingQueueItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dt', models.DateTimeField(auto_now_add=True, verbose_name='Date and time of adding to queue')),
+                ('keyword', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='gatherer.keyword')),
+            ],
+        ),
+    ]
@@ -161,13 +161,17 @@ class DigestRecord(models.Model):
     def title_keywords_names(self):
         return f'{", ".join([k.name for k in self.title_keywords.all()])}'
 
+    # Filtered in memory to use prefetched keywords
     def not_proprietary_keywords(self):
-        return self.title_keywords.filter(proprietary=False, is_generic=False)
+        return [k for k in self.title_keywords.all() if k.proprietary is False and k.is_generic is False]
 
     def proprietary_keywords(self):
-        return self.title_keywords.filter(proprietary=True)
+        return [k for k in self.title_keywords.all() if k.proprietary is True]
 
     class Meta:
+        indexes = [
+            models.Index(fields=['state', 'gather_dt']),
+        ]
         verbose_name = 'Digest Record'
         verbose_name_plural = 'Digest Records'
 
@@ -240,6 +244,20 @@ class Keyword(models.Model):
         return f'{self.name} ({self.content_category}, {"GENERIC" if self.is_generic else "NON-GENERIC"}, {"PROPRIETARY" if self.proprietary else "NOT PROPRIETARY"})'
 
 
+class KeywordRetaggingQueueItem(models.Model):
+
+    # Keyword could be queued several times if it is changed while previous changes are being processed
+    keyword = models.ForeignKey(to=Keyword,
+                                on_delete=models.CASCADE,
+                                blank=False,
+                                null=False)
+    dt = models.DateTimeField(verbose_name='Date and time of adding to queue',
+                              auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.keyword_id}'
+
+
 class DigestRecordsSource(models.Model):
 
     name = models.CharField(verbose_name='Name',
@@ -262,6 +280,25 @@ class DigestRecordsSource(models.Model):
                                 blank=True)
     text_fetching_enabled = models.BooleanField(verbose_name='Text fetching enabled',
                                                 default=False)
+    etag = models.CharField(verbose_name='ETag of last fetched data',
+                            max_length=1024,
+                            null=True,
+                            blank=True)
+    last_modified = models.CharField(verbose_name='Last-Modified of last fetched data',
+                                     max_length=128,
+                                     null=True,
+                                     blank=True)
+    watermark_url = models.CharField(verbose_name='URL of newest fetched post',
+                                     max_length=256,
+                                     null=True,
+                                     blank=True)
+    watermark_dt = models.DateTimeField(verbose_name='Date of newest fetched post',
+                                        null=True,
+                                        blank=True)
+    data_hash = models.CharField(verbose_name='SHA-256 of last fetched data',
+                                 max_length=64,
+                                 null=True,
+                                 blank=True)
 
     class Meta:
         verbose_name = 'Digest Records Source'
@@ -318,7 +355,12 @@ class DigestGatheringIteration(models.Model):
     parser_error = models.TextField(verbose_name='Parser error',
                                     blank=True,
                                     null=True)
+    source_unchanged = models.BooleanField(verbose_name='Source unchanged since previous iteration',
+                                           default=False)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['source', 'dt']),
+        ]
         verbose_name = 'Digest Gathering Iteration'
         verbose_name_plural = 'Digest Gathering Iterations'
\ No newline at end of file
@@ -1,3 +1,4 @@
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
 
 from gatherer.models import *
@@ -72,10 +73,49 @@ class KeywordSerializer(serializers.ModelSerializer):
         ]
 
 
+class DigestRecordsSourceSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = DigestRecordsSource
+        depth = 1
+        # Gathering state of source is internal and not exposed
+        fields = [
+            'id',
+            'name',
+            'enabled',
+            'data_url',
+            'projects',
+            'language',
+            'text_fetching_enabled',
+        ]
+
+
 class DigestRecordDetailedSerializer(serializers.ModelSerializer):
+    source = DigestRecordsSourceSerializer(read_only=True)
     not_proprietary_keywords = KeywordSerializer(many=True, read_only=True)
     proprietary_keywords = KeywordSerializer(many=True, read_only=True)
 
+    # Relations expanded by `depth = 2`, loaded once for all serialized records instead of once per record
+    SELECT_RELATED_FIELDS = (
+        'source',
+        'digest_issue',
+    )
+    PREFETCH_RELATED_LOOKUPS = (
+        'source__projects',
+        'title_keywords',
+        'projects',
+        # Estimations get already loaded record as their `digest_record` from prefetching of reverse relation
+        'tbot_estimations__telegram_bot_user',
+    )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related(*cls.SELECT_RELATED_FIELDS).prefetch_related(*cls.PREFETCH_RELATED_LOOKUPS)
+
+    @classmethod
+    def eager_load_objects(cls, digest_records):
+        prefetch_related_objects(digest_records, *cls.SELECT_RELATED_FIELDS, *cls.PREFETCH_RELATED_LOOKUPS)
+
     def to_representation(self, instance):
         # TODO: Extract common code from here and DigestRecordSerializer
         representation = super().to_representation(instance)
@@ -4,10 +4,63 @@ from rest_framework import status
 from rest_framework.test import APITestCase
 from gatherer.models import *
 from django.forms.models import model_to_dict
+import io
+import json
+import logging
+import os
 import random
 import string
+import tempfile
+import threading
+import time
+import unittest
 from django.utils.http import urlencode
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, skipUnlessDBFeature
+import requests
+from requests.structures import CaseInsensitiveDict
+from unittest import mock
 from rest_framework.test import APIRequestFactory
+from gatherer.keywordsmatcher import KeywordsMatcher
+from fngs.pagination import Pagination
+from tbot.models import (
+    TelegramBotDigestRecordCategorizationAttempt,
+    TelegramBotUser,
+)
+from gatherer.keywordsindex import keywords_index
+from ds.models import LemmasIndexingQueueItem
+from gatherer.httpclient import (
+    MAX_BACKOFF_SECONDS,
+    HttpClient,
+)
+from gatherer.dateparsing import (
+    is_fast_parseable,
+    parse_feed_datetime,
+)
+from gatherer.feedparsing import (
+    FeedReader,
+    FeedTooLargeException,
+    iterparse_feed_items,
+)
+from gatherer.keywordsretagging import (
+    iterate_digest_records_chunks,
+    match_titles,
+    retag_keyword_digest_records,
+    retag_queued_keywords,
+    save_title_keywords_diff,
+)
+from gatherer.digestrecordsdates import backfill_digest_records_dates
+from gatherer.gatheringschedule import (
+    MAX_POLLING_INTERVAL,
+    MIN_POLLING_INTERVAL,
+    polling_interval,
+    sources_due,
+)
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 
 TEST_USERNAME = 'admin'
@@ -40,6 +93,47 @@ def with_login(func):
     return _wrapper
 
 
+def import_gathering_commands():
+    # Parsing modules get projects from database when they are imported
+    for project_name in ('FOSS News', 'OS Friday'):
+        Project.objects.get_or_create(name=project_name)
+    from gatherer.management.commands import gatherfromsources, sources
+    return gatherfromsources, sources
+
+
+class FakeHttpAdapter(requests.adapters.BaseAdapter):
+    # Returns prepared responses or raises prepared exceptions instead of sending requests
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.sent_requests = []
+
+    def send(self, request, **kwargs):
+        self.sent_requests.append(request)
+        response_data = self.responses.pop(0)
+        if isinstance(response_data, Exception):
+            raise response_data
+        status_code, headers, body = response_data
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def fake_http_client(responses, **kwargs):
+    http_client = HttpClient(**kwargs)
+    adapter = FakeHttpAdapter(responses)
+    http_client.session.mount('https://', adapter)
+    return http_client, adapter
+
+
 class RandomEntityGenerator:
 
     @classmethod
@@ -196,3 +290,710 @@ class OldestNotCategorizedDigestRecordViewSetTests(APITestCase, TestMixin):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['results'][0]['title'],
                          example_digest_record_1['title'])
+
+
+class DigestRecordDetailedListTests(APITestCase, TestMixin):
+
+    # Session and user, page count and records, then one query per prefetched relation
+    DETAILED_PAGE_QUERIES_COUNT = 9
+
+    def create_digest_records(self, count):
+        project = Project.objects.create(name=RandomProjectGenerator.random_word())
+        source = DigestRecordsSource.objects.create(name=RandomEntityGenerator.random_word(), enabled=True)
+        source.projects.set([project])
+        digest_issue = DigestIssue.objects.create(number=random.randint(1, 1000000))
+        keywords = [Keyword.objects.create(name=RandomEntityGenerator.random_word(), is_generic=False, proprietary=proprietary)
+                    for proprietary in (False, True)]
+        tbot_user = TelegramBotUser.objects.create(tid=random.randint(1, 1000000), username=RandomEntityGenerator.random_word())
+        for _ in range(count):
+            digest_record = DigestRecord.objects.create(dt=datetime.datetime.now(tz=datetime.timezone.utc),
+                                                        title=RandomEntityGenerator.random_word(),
+                                                        url=RandomEntityGenerator.random_word(10),
+                                                        source=source,
+                                                        digest_issue=digest_issue)
+            digest_record.projects.set([project])
+            digest_record.title_keywords.set(keywords)
+            TelegramBotDigestRecordCategorizationAttempt.objects.create(dt=datetime.datetime.now(tz=datetime.timezone.utc),
+                                                                        telegram_bot_user=tbot_user,
+                                                                        digest_record=digest_record)
+
+    @with_login
+    def test_queries_count_does_not_depend_on_page_size(self):
+        self.create_digest_records(20)
+        url = reverse('digest-record-detailed-list')
+        for page_size in (5, 20):
+            with self.assertNumQueries(self.DETAILED_PAGE_QUERIES_COUNT):
+                response = self.client.get(self.add_params_to_url(url, {'page_size': page_size}))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results = response.json()['results']
+            self.assertEqual(len(results), page_size)
+            self.assertEqual([len(r['not_proprietary_keywords']) for r in results], [1] * page_size)
+            self.assertEqual([len(r['proprietary_keywords']) for r in results], [1] * page_size)
+            self.assertEqual([len(r['tbot_estimations']) for r in results], [1] * page_size)
+            estimated_digest_record = results[0]['tbot_estimations'][0]['digest_record']
+            self.assertEqual(estimated_digest_record['id'], results[0]['id'])
+            self.assertEqual((len(estimated_digest_record['title_keywords']), len(estimated_digest_record['projects'])), (2, 1))
+            self.assertNotIn('etag', results[0]['source'])
+            self.assertEqual(len(results[0]['source']['projects']), 1)
+
+
+class DigestRecordCursorPaginationTests(APITestCase, TestMixin):
+
+    @with_login
+    def test_all_records_are_listed_once(self):
+        dt = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+        # Same dates and empty dates should not break ordering
+        dts = [dt, dt, dt + datetime.timedelta(days=1), None, dt - datetime.timedelta(days=1), None, dt]
+        for record_dt in dts:
+            DigestRecord.objects.create(dt=record_dt, title=RandomEntityGenerator.random_word(), url=RandomEntityGenerator.random_word(10))
+        url = self.add_params_to_url(reverse('digest-record-detailed-list'), {'pagination': 'cursor', 'page_size': 2})
+        listed_ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            listed_ids += [r['id'] for r in response.json()['results']]
+            url = response.json()['links']['next']
+        expected_ids = [r.id for r in sorted(DigestRecord.objects.all(),
+                                             key=lambda r: (r.dt is None, r.dt or dt, r.id))]
+        self.assertEqual(listed_ids, expected_ids)
+
+    @with_login
+    def test_invalid_cursor(self):
+        DigestRecord.objects.create(dt=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc), title='Title', url='https://example.com')
+        for cursor in ('bad',
+                       Pagination._encode_cursor('bad', 1),
+                       Pagination._encode_cursor('2023-13-01T00:00:00+00:00', 1),
+                       Pagination._encode_cursor(['2023-01-01T00:00:00+00:00'], 1),
+                       Pagination._encode_cursor('2023-01-01T00:00:00+00:00', 'bad')):
+            url = self.add_params_to_url(reverse('digest-record-detailed-list'), {'pagination': 'cursor', 'cursor': cursor})
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, cursor)
+
+
+class DigestRecordExportTests(APITestCase, TestMixin):
+
+    def setUp(self):
+        self.project = Project.objects.create(name=RandomProjectGenerator.random_word())
+        self.keyword = Keyword.objects.create(name='Linux', is_generic=False, proprietary=False)
+        self.digest_records = []
+        for state in ('IN_DIGEST', 'IN_DIGEST', 'SKIPPED'):
+            digest_record = DigestRecord.objects.create(dt=datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc),
+                                                        title=RandomEntityGenerator.random_word(),
+                                                        url=RandomEntityGenerator.random_word(10),
+                                                        state=state)
+            digest_record.projects.set([self.project])
+            digest_record.title_keywords.set([self.keyword])
+            self.digest_records.append(digest_record)
+
+    def test_without_login(self):
+        response = self.client.get(reverse('digest-record-export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @with_login
+    def test_ndjson(self):
+        url = self.add_params_to_url(reverse('digest-record-export'), {'state': 'IN_DIGEST', 'project': self.project.name})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [dr.id for dr in self.digest_records[:2]])
+        self.assertEqual(rows[0]['title_keywords'], ['Linux'])
+        self.assertEqual(rows[0]['projects'], [self.project.name])
+
+    @with_login
+    def test_csv(self):
+        url = self.add_params_to_url(reverse('digest-record-export'), {'output': 'csv', 'dt_to': '2023-01-01T00:00:00Z'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith('id,dt,'))
+
+    @with_login
+    def test_bad_output(self):
+        response = self.client.get(self.add_params_to_url(reverse('digest-record-export'), {'output': 'xml'}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DumpForMlTests(TestCase):
+
+    def setUp(self):
+        digest_issue = DigestIssue.objects.create(number=1)
+        linux_keyword = Keyword.objects.create(name='Linux', is_generic=False, proprietary=False, content_category='SYSTEM')
+        gnome_keyword = Keyword.objects.create(name='GNOME', is_generic=True, proprietary=False)
+        dt = datetime.datetime(2022, 5, 2, 10, 0, tzinfo=datetime.timezone.utc)
+        self.linux_record = DigestRecord.objects.create(title='Linux 6.0 released', url='https://example.com/linux', dt=dt,
+                                                        state='IN_DIGEST', digest_issue=digest_issue)
+        self.linux_record.title_keywords.set([linux_keyword])
+        self.gnome_record = DigestRecord.objects.create(title='GNOME 43 released', url='https://example.com/gnome', dt=dt,
+                                                        state='IN_DIGEST', digest_issue=digest_issue)
+        self.gnome_record.title_keywords.set([gnome_keyword])
+        DigestRecord.objects.create(title='Skipped', url='https://example.com/skipped', dt=dt, state='SKIPPED')
+        self.similar_records = SimilarDigestRecords.objects.create(digest_issue=digest_issue)
+        self.similar_records.digest_records.set([self.linux_record, self.gnome_record])
+        self.directory = tempfile.TemporaryDirectory()
+        self.records_path = os.path.join(self.directory.name, 'records')
+        self.similar_records_path = os.path.join(self.directory.name, 'similar_records')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def dump(self, output_format, *args):
+        # Small chunk size checks that relations are prefetched for each chunk
+        call_command('dumpforml', '-o', output_format, '-c', '1', '-s', self.similar_records_path, *args, self.records_path)
+
+    def assertRecordsDumped(self, records, similar_records):
+        self.assertEqual([(r['id'], r['datetime'], r['digest_number'], r['title'], r['url'], r['keywords']) for r in records],
+                         [(self.linux_record.id, '2022-05-02 10:00:00', 1, 'Linux 6.0 released', 'https://example.com/linux',
+                           [{'name': 'Linux', 'foss': True, 'generic': False, 'category': 'SYSTEM'}]),
+                          (self.gnome_record.id, '2022-05-02 10:00:00', 1, 'GNOME 43 released', 'https://example.com/gnome',
+                           [{'name': 'GNOME', 'foss': True, 'generic': True, 'category': None}])])
+        self.assertEqual([(r['id'], r['digest_number'], sorted(r['digest_records_ids'])) for r in similar_records],
+                         [(self.similar_records.id, 1, sorted([self.linux_record.id, self.gnome_record.id]))])
+
+    def test_json(self):
+        self.dump('JSON')
+        with open(self.records_path) as records_file, open(self.similar_records_path) as similar_records_file:
+            self.assertRecordsDumped(json.load(records_file), json.load(similar_records_file))
+        self.dump('JSON', '--all')
+        with open(self.records_path) as records_file:
+            self.assertEqual(len(json.load(records_file)), 3)
+
+    def test_jsonl(self):
+        self.dump('JSONL')
+        with open(self.records_path) as records_file, open(self.similar_records_path) as similar_records_file:
+            self.assertRecordsDumped([json.loads(line) for line in records_file],
+                                     [json.loads(line) for line in similar_records_file])
+
+    def test_csv(self):
+        call_command('dumpforml', '-o', 'CSV', self.records_path)
+        with open(self.records_path) as records_file:
+            self.assertEqual(records_file.read(),
+                             f'{self.linux_record.id}\tLinux 6.0 released\thttps://example.com/linux\tLinux\tTrue\tSYSTEM\n'
+                             f'{self.gnome_record.id}\tGNOME 43 released\thttps://example.com/gnome\n')
+        with self.assertRaisesMessage(CommandError, 'CSV output format is not supported for similar digest records'):
+            self.dump('CSV')
+
+    @unittest.skipIf(pyarrow is None, '`pyarrow` package is not installed')
+    def test_parquet(self):
+        self.dump('PARQUET')
+        self.assertRecordsDumped(pyarrow.parquet.read_table(self.records_path).to_pylist(),
+                                 pyarrow.parquet.read_table(self.similar_records_path).to_pylist())
+
+
+class KeywordsMatcherTests(SimpleTestCase):
+
+    def test_find_all_overlapping_keywords(self):
+        keywords_matcher = KeywordsMatcher(['Linux Foundation', 'Linux', 'Foundation', 'BSD'])
+        self.assertEqual(keywords_matcher.find('The linux foundation announced'),
+                         ['Linux Foundation', 'Linux', 'Foundation'])
+
+    def test_word_boundaries(self):
+        keywords_matcher = KeywordsMatcher(['Go', 'C++', '.NET'])
+        self.assertEqual(keywords_matcher.find('Google drops Gopher'), [])
+        self.assertEqual(keywords_matcher.find('Go 2 and ASP.NET'), ['Go', '.NET'])
+        self.assertEqual(keywords_matcher.find('C++ news'), [])
+        self.assertEqual(keywords_matcher.find('C++20 news'), ['C++'])
+
+    def test_matches(self):
+        keywords_matcher = KeywordsMatcher(['Kubernetes'])
+        self.assertTrue(keywords_matcher.matches('What is new in KUBERNETES 1.28'))
+        self.assertFalse(keywords_matcher.matches('What is new in K8s'))
+        self.assertFalse(KeywordsMatcher([]).matches('Kubernetes'))
+
+
+class FeedParsingTests(SimpleTestCase):
+    FEED = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss><channel><title>Feed</title>'
+            + ''.join(f'<item><title>Post {i}</title><link>https://example.com/{i}</link></item>' for i in range(100))
+            + '</channel></rss>').encode()
+
+    @staticmethod
+    def _response(body: bytes):
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(body)
+        return response
+
+    def test_items_are_parsed_and_freed(self):
+        titles = []
+        channel = None
+        for item in iterparse_feed_items(FeedReader(self._response(self.FEED)), 'item', lambda root: root[0]):
+            titles.append(item.findtext('title'))
+            channel = item.getparent()
+        self.assertEqual(titles, [f'Post {i}' for i in range(100)])
+        # Only the last item is kept
+        self.assertEqual(len(channel), 1)
+
+    def test_entities_are_not_resolved(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt') as secret_file:
+            secret_file.write('Secret')
+            secret_file.flush()
+            feed = (f'<?xml version="1.0"?><!DOCTYPE rss [<!ENTITY secret SYSTEM "file://{secret_file.name}">]>'
+                    '<rss><channel><item><title>Post &secret;</title></item></channel></rss>').encode()
+            titles = [''.join(item.find('title').itertext())
+                      for item in iterparse_feed_items(FeedReader(self._response(feed)), 'item', lambda root: root[0])]
+        self.assertEqual(titles, ['Post &secret;'])
+
+    def test_max_size(self):
+        with self.assertRaises(FeedTooLargeException):
+            list(iterparse_feed_items(FeedReader(self._response(self.FEED), max_size=1000), 'item', lambda root: root[0]))
+
+
+class ParsingPipelineTests(TestCase):
+
+    def setUp(self):
+        _, self.sources = import_gathering_commands()
+        DigestRecordsSource.objects.create(name='PipelineTest', enabled=True)
+        Keyword.objects.create(name='Linux', is_generic=False, proprietary=False)
+        Keyword.objects.create(name='GNOME', is_generic=True, proprietary=False)
+        dt_now = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.posts = [
+            (dt_now, 'Linux 6.0 released', 'https://example.com/1'),
+            (dt_now - datetime.timedelta(days=1), 'GNOME 43 released', 'https://example.com/2'),
+            (dt_now - datetime.timedelta(days=10), 'Linux 5.0 released', 'https://example.com/3'),
+            (None, 'Linux news without date', 'https://example.com/4'),
+            (dt_now, '', 'https://example.com/5'),
+        ]
+
+    def parse(self, filters, posts=None, exception=None):
+        def _parse(parsing_module):
+            for dt, title, url in posts or self.posts:
+                yield self.sources.PostData(dt, title, url, None)
+            if exception is not None:
+                raise exception
+        parsing_module_class = type('PipelineTestParsingModule', (self.sources.BasicParsingModule,),
+                                    {'_parse': _parse, 'filtration_needed': bool(filters), 'filters': filters})
+        return parsing_module_class(logging.getLogger(__name__)).parse(days_count=7)
+
+    def test_specific_filtration(self):
+        parsing_result = self.parse([self.sources.FiltrationType.SPECIFIC])
+        self.assertEqual(parsing_result.overall_count, 5)
+        # Outdated posts are dropped first, then posts without titles are dropped by keywords filtration
+        self.assertEqual([(post_data.url, post_data.filtered, post_data.keywords) for post_data in parsing_result.posts_data_after_filtration],
+                         [('https://example.com/1', False, ['Linux']),
+                          ('https://example.com/2', True, ['GNOME']),
+                          ('https://example.com/4', False, ['Linux'])])
+        self.assertEqual(list(parsing_result.outdated_posts_dts_by_url), ['https://example.com/3'])
+
+    def test_without_filtration(self):
+        parsing_result = self.parse([])
+        self.assertEqual(parsing_result.overall_count, 5)
+        self.assertEqual([(post_data.url, post_data.filtered) for post_data in parsing_result.posts_data_after_filtration],
+                         [('https://example.com/1', None),
+                          ('https://example.com/2', None),
+                          ('https://example.com/4', None),
+                          ('https://example.com/5', None)])
+
+    def test_errors_while_parsing(self):
+        parsing_result = self.parse([], exception=self.sources.DigestSourceException('Broken feed'))
+        self.assertEqual((parsing_result.overall_count, parsing_result.posts_data_after_filtration), (0, []))
+        self.assertEqual(parsing_result.source_error, 'Broken feed')
+        parsing_result = self.parse([], exception=ValueError('Broken parser'))
+        self.assertEqual(parsing_result.parser_error, 'Broken parser')
+
+    def test_posts_data_counter(self):
+        posts_data = self.sources.PostsDataCounter(iter(range(3)))
+        self.assertEqual(posts_data.count, 0)
+        self.assertEqual(next(iter(posts_data)), 0)
+        self.assertEqual(posts_data.count, 1)
+
+
+class RssParsingTests(TestCase):
+
+    def setUp(self):
+        self.gatherfromsources, self.sources = import_gathering_commands()
+        self.source = DigestRecordsSource.objects.create(name='FeedTest', enabled=True, data_url='https://example.com/feed')
+        self.parsing_module_class = type('FeedTestParsingModule', (self.sources.SimpleRssBasicParsingModule,), {})
+
+    @staticmethod
+    def feed(days):
+        return ('<rss><channel><title>Feed</title>'
+                + ''.join(f'<item><title>Post {day}</title><link>https://example.com/{day}</link>'
+                          f'<pubDate>Mon, {day:02d} May 2022 10:00:00 +0000</pubDate><description>Post</description></item>'
+                          for day in days)
+                + '</channel></rss>').encode()
+
+    def fetch(self, status_code, headers, body, force=False):
+        parsing_module = self.parsing_module_class(logging.getLogger(__name__))
+        parsing_module.http_client, adapter = fake_http_client([(status_code, headers, body)])
+        parsing_module.conditional_fetching_enabled = not force
+        parsing_result = parsing_module.parse(days_count=100000)
+        self.assertTrue(parsing_result.success)
+        if not parsing_result.source_unchanged:
+            self.gatherfromsources.Command._save_source_validators(self.source, parsing_result)
+        return parsing_result, adapter.sent_requests[0]
+
+    def parse(self, body, force=False):
+        parsing_result, _ = self.fetch(200, {}, body, force)
+        return parsing_result
+
+    def assertParsed(self, parsing_result, days, watermark_day):
+        self.assertEqual([post_data.url for post_data in parsing_result.posts_data_after_filtration],
+                         [f'https://example.com/{day}' for day in days])
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.watermark_url, f'https://example.com/{watermark_day}' if watermark_day else None)
+
+    def test_conditional_headers(self):
+        validators_headers = {'ETag': '"v1"', 'Last-Modified': 'Mon, 02 May 2022 10:00:00 GMT'}
+        _, request = self.fetch(200, validators_headers, self.feed([2, 1]))
+        self.assertNotIn('If-None-Match', request.headers)
+        self.assertNotIn('If-Modified-Since', request.headers)
+        self.source.refresh_from_db()
+        self.assertEqual((self.source.etag, self.source.last_modified), ('"v1"', 'Mon, 02 May 2022 10:00:00 GMT'))
+        parsing_result, request = self.fetch(304, {}, b'')
+        self.assertEqual(request.headers['If-None-Match'], '"v1"')
+        self.assertEqual(request.headers['If-Modified-Since'], 'Mon, 02 May 2022 10:00:00 GMT')
+        self.assertTrue(parsing_result.source_unchanged)
+        self.assertEqual(parsing_result.posts_data_after_filtration, [])
+        _, request = self.fetch(200, validators_headers, self.feed([2, 1]), force=True)
+        self.assertNotIn('If-None-Match', request.headers)
+        self.assertNotIn('If-Modified-Since', request.headers)
+
+    def test_not_modified_exception(self):
+        parsing_module = self.parsing_module_class(logging.getLogger(__name__))
+        parsing_module.http_client, _ = fake_http_client([(304, {}, b'')])
+        with self.assertRaises(self.sources.DigestSourceNotModifiedException):
+            list(parsing_module._parse())
+
+    def test_validators_are_saved_only_when_changed(self):
+        self.assertParsed(self.parse(self.feed([2, 1])), [2, 1], 2)
+        parsing_result = self.sources.ParsingResult(0, [], True, None, None,
+                                                    etag=self.source.etag,
+                                                    last_modified=self.source.last_modified,
+                                                    watermark_url=self.source.watermark_url,
+                                                    watermark_dt=self.source.watermark_dt,
+                                                    data_hash=self.source.data_hash)
+        with self.assertNumQueries(0):
+            self.gatherfromsources.Command._save_source_validators(self.source, parsing_result)
+        parsing_result.etag = '"v2"'
+        with self.assertNumQueries(1), \
+                mock.patch.object(DigestRecordsSource, 'save', autospec=True, side_effect=DigestRecordsSource.save) as save:
+            self.gatherfromsources.Command._save_source_validators(self.source, parsing_result)
+        self.assertEqual(save.call_args.kwargs['update_fields'], ['etag'])
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.etag, '"v2"')
+
+    def test_not_changed_feed_is_not_parsed(self):
+        self.assertParsed(self.parse(self.feed([3, 2, 1])), [3, 2, 1], 3)
+        with mock.patch.object(self.sources, 'iterparse_feed_items') as iterparse_feed_items:
+            parsing_result = self.parse(self.feed([3, 2, 1]))
+        iterparse_feed_items.assert_not_called()
+        self.assertTrue(parsing_result.source_unchanged)
+        self.assertEqual(parsing_result.posts_data_after_filtration, [])
+
+    def test_parsing_stops_on_watermark(self):
+        self.assertParsed(self.parse(self.feed([3, 2, 1])), [3, 2, 1], 3)
+        self.assertParsed(self.parse(self.feed([5, 4, 3, 2, 1])), [5, 4], 5)
+        # Newest post parsed before is removed
+        self.assertParsed(self.parse(self.feed([7, 6, 4, 3, 2])), [7, 6], 7)
+
+    def test_not_ordered_feed_is_parsed_fully(self):
+        self.assertParsed(self.parse(self.feed([3, 2, 1])), [3, 2, 1], 3)
+        self.assertParsed(self.parse(self.feed([1, 2, 3, 4])), [1, 2, 3, 4], None)
+        self.assertParsed(self.parse(self.feed([5, 4, 3, 2, 1])), [5, 4, 3, 2, 1], 5)
+        self.assertParsed(self.parse(self.feed([6, 7, 5, 4])), [6, 7, 5, 4], None)
+
+    def test_fetch_dates_strs(self):
+        parsing_module = self.parsing_module_class(logging.getLogger(__name__))
+        parsing_module.http_client, _ = fake_http_client([(200, {}, self.feed([2, 1]))])
+        self.assertEqual(list(parsing_module.fetch_dates_strs()),
+                         ['Mon, 02 May 2022 10:00:00 +0000', 'Mon, 01 May 2022 10:00:00 +0000'])
+
+    def test_forced_parsing_ignores_watermark(self):
+        self.assertParsed(self.parse(self.feed([3, 2, 1])), [3, 2, 1], 3)
+        self.assertParsed(self.parse(self.feed([4, 3, 2, 1]), force=True), [4, 3, 2, 1], 4)
+        self.assertParsed(self.parse(self.feed([4, 3, 2, 1]), force=True), [4, 3, 2, 1], 4)
+
+
+@skipUnlessDBFeature('can_return_rows_from_bulk_insert')
+class SavingToDatabaseTests(TestCase):
+
+    def setUp(self):
+        self.gatherfromsources, self.sources = import_gathering_commands()
+        self.source = DigestRecordsSource.objects.create(name='SavingTest', enabled=True, language=Language.ENGLISH.name)
+        self.source.projects.set(Project.objects.filter(name__in=('FOSS News', 'OS Friday')))
+        self.linux_keyword = Keyword.objects.create(name='Linux', is_generic=False, proprietary=False)
+        self.gnome_keyword = Keyword.objects.create(name='GNOME', is_generic=True, proprietary=False)
+        self.dt = datetime.datetime(2022, 5, 2, 10, 0, tzinfo=datetime.timezone.utc)
+        self.existing_record = DigestRecord.objects.create(title='Existing', url='https://example.com/existing', dt=self.dt)
+        self.without_dt_record = DigestRecord.objects.create(title='Without date', url='https://example.com/without-dt')
+        self.outdated_record = DigestRecord.objects.create(title='Outdated', url='https://example.com/outdated')
+
+    def post_data(self, url, title, keywords, dt=None, brief=None):
+        post_data = self.sources.PostData(dt, title, url, brief)
+        post_data.keywords = keywords
+        return post_data
+
+    def test_save_to_database(self):
+        parsing_result = self.sources.ParsingResult(
+            5,
+            [self.post_data('https://example.com/linux', 'Linux 6.0 released', ['Linux'], brief='<p>Linux 6.0</p>'),
+             self.post_data('https://example.com/gnome', 'GNOME on Linux', ['GNOME', 'Linux', 'Linux']),
+             self.post_data('https://example.com/gnome', 'GNOME on Linux', ['GNOME', 'Linux'], dt=self.dt),
+             self.post_data('https://example.com/existing', 'Existing', [], dt=self.dt + datetime.timedelta(days=1)),
+             self.post_data('https://example.com/without-dt', 'Without date', [], dt=self.dt)],
+            True, None, None,
+            outdated_posts_dts_by_url={'https://example.com/outdated': self.dt})
+        command = self.gatherfromsources.Command()
+        parsing_module = type('SavingTestParsingModule', (self.sources.SimpleRssBasicParsingModule,), {})(logging.getLogger(__name__))
+        iteration, posts_data_one = command._save_iteration(parsing_module, parsing_result)
+        keywords_index()
+        # Queries count does not depend on posts count
+        with self.assertNumQueries(12):
+            command._save_to_database(iteration, posts_data_one, parsing_result.outdated_posts_dts_by_url)
+        linux_record = DigestRecord.objects.get(url='https://example.com/linux')
+        gnome_record = DigestRecord.objects.get(url='https://example.com/gnome')
+        self.assertEqual(DigestRecord.objects.count(), 5)
+        for digest_record in (linux_record, gnome_record):
+            self.assertCountEqual(digest_record.projects.all(), self.source.projects.all())
+        self.assertEqual(list(linux_record.title_keywords.all()), [self.linux_keyword])
+        self.assertCountEqual(gnome_record.title_keywords.all(), [self.linux_keyword, self.gnome_keyword])
+        # Date of post repeated in the same feed is saved with the new record
+        self.assertEqual(gnome_record.dt, self.dt)
+        self.existing_record.refresh_from_db()
+        self.without_dt_record.refresh_from_db()
+        self.outdated_record.refresh_from_db()
+        self.assertEqual((self.existing_record.dt, self.without_dt_record.dt, self.outdated_record.dt), (self.dt, self.dt, self.dt))
+        self.assertEqual(list(LemmasIndexingQueueItem.objects.values_list('digest_record_id', flat=True)), [linux_record.id])
+        iteration.refresh_from_db()
+        self.assertEqual((iteration.gathered_count, iteration.saved_count), (5, 2))
+
+
+class HttpClientTests(SimpleTestCase):
+
+    def get(self, responses, **kwargs):
+        http_client, adapter = fake_http_client(responses, **kwargs)
+        with mock.patch('gatherer.httpclient.time.sleep') as sleep:
+            response = http_client.get('https://example.com/feed')
+        return response, adapter, [delay for (delay,), _ in sleep.call_args_list]
+
+    def test_retries_with_retry_after(self):
+        response, adapter, delays = self.get([(429, {'Retry-After': '5'}, b''),
+                                              (503, {'Retry-After': '3600'}, b''),
+                                              (200, {}, b'feed')])
+        self.assertEqual((response.status_code, response.content), (200, b'feed'))
+        self.assertEqual(len(adapter.sent_requests), 3)
+        self.assertEqual(delays, [5, MAX_BACKOFF_SECONDS])
+
+    def test_backoff(self):
+        with mock.patch('gatherer.httpclient.random.uniform', side_effect=lambda a, b: b) as uniform:
+            response, adapter, delays = self.get([(500, {}, b''),
+                                                  requests.ConnectionError('Connection refused'),
+                                                  (502, {'Retry-After': 'Mon, 02 May 2022 10:00:00 GMT'}, b''),
+                                                  requests.Timeout('Timed out'),
+                                                  (200, {}, b'feed')],
+                                                 retries_count=4, backoff_seconds=10)
+        self.assertEqual(response.status_code, 200)
+        # Delays are random up to exponential backoff limited by max one, unparseable Retry-After is ignored
+        self.assertEqual(uniform.call_args_list, [mock.call(0, 10), mock.call(0, 20), mock.call(0, 40), mock.call(0, MAX_BACKOFF_SECONDS)])
+        self.assertEqual(delays, [10, 20, 40, MAX_BACKOFF_SECONDS])
+
+    def test_retries_count(self):
+        response, adapter, delays = self.get([(500, {}, b''), (504, {}, b''), (500, {}, b'error')], retries_count=2)
+        self.assertEqual((response.status_code, response.content), (500, b'error'))
+        self.assertEqual(len(delays), 2)
+        response, adapter, delays = self.get([(404, {}, b'')], retries_count=2)
+        self.assertEqual((response.status_code, len(adapter.sent_requests), delays), (404, 1, []))
+        with self.assertRaises(requests.ConnectionError):
+            self.get([requests.ConnectionError('Connection refused')] * 2, retries_count=1)
+
+
+class FakeParsingModule:
+    # Tracks how many modules of the same host are parsed at once
+
+    lock = threading.Lock()
+
+    def __init__(self, source_name, data_url, running_counts, max_running_counts):
+        self.source_name = source_name
+        self.data_url = data_url
+        self.running_counts = running_counts
+        self.max_running_counts = max_running_counts
+
+    def parse(self, days_count):
+        host = self.data_url.split('/')[2]
+        with self.lock:
+            self.running_counts[host] = self.running_counts.get(host, 0) + 1
+            self.max_running_counts[host] = max(self.max_running_counts.get(host, 0), self.running_counts[host])
+        time.sleep(0.01)
+        with self.lock:
+            self.running_counts[host] -= 1
+        return self.source_name
+
+
+class HostsSchedulerTests(TestCase):
+
+    def setUp(self):
+        self.gatherfromsources, _ = import_gathering_commands()
+        self.running_counts = {}
+        self.max_running_counts = {}
+
+    def parsing_modules(self, hosts):
+        return [FakeParsingModule(f'{host}{i}', f'https://{host}/feed{i}', self.running_counts, self.max_running_counts)
+                for host, count in hosts
+                for i in range(count)]
+
+    def test_next_parsing_modules(self):
+        parsing_modules = self.parsing_modules([('a.com', 3), ('b.com', 1), ('c.com', 2)])
+        scheduler = self.gatherfromsources.HostsScheduler(parsing_modules, 2)
+        # Hosts are taken in turn
+        self.assertEqual([m.source_name for m in scheduler.next_parsing_modules(4)], ['a.com0', 'b.com0', 'c.com0', 'a.com1'])
+        self.assertEqual([m.source_name for m in scheduler.next_parsing_modules(4)], ['c.com1'])
+        self.assertEqual(scheduler.next_parsing_modules(4), [])
+        scheduler.finish(parsing_modules[3])
+        self.assertEqual(scheduler.next_parsing_modules(4), [])
+        scheduler.finish(parsing_modules[0])
+        self.assertEqual([m.source_name for m in scheduler.next_parsing_modules(4)], ['a.com2'])
+
+    def test_parse_concurrently(self):
+        parsing_modules = self.parsing_modules([('a.com', 6), ('b.com', 1), ('c.com', 2)])
+        hosts_scheduler_class = self.gatherfromsources.HostsScheduler
+        next_parsing_modules, finish = hosts_scheduler_class.next_parsing_modules, hosts_scheduler_class.finish
+        scheduled_parsing_modules, finished_parsing_modules, events = [], [], []
+
+        def _queued_and_running_counts(host):
+            scheduled = [m for m in scheduled_parsing_modules if m.data_url.split('/')[2] == host]
+            finished = [m for m in finished_parsing_modules if m.data_url.split('/')[2] == host]
+            return len([m for m in parsing_modules if m.data_url.split('/')[2] == host]) - len(scheduled), len(scheduled) - len(finished)
+
+        def _next_parsing_modules(scheduler, count):
+            result = next_parsing_modules(scheduler, count)
+            scheduled_parsing_modules.extend(result)
+            events.append(('next', None))
+            # Workers are left free only when remaining sources wait for their busy hosts
+            queued_and_running_counts = [_queued_and_running_counts(host) for host in ('a.com', 'b.com', 'c.com')]
+            if sum(running for _, running in queued_and_running_counts) < 3:
+                self.assertTrue(all(queued == 0 or running == 2 for queued, running in queued_and_running_counts))
+            return result
+
+        def _finish(scheduler, parsing_module):
+            finish(scheduler, parsing_module)
+            finished_parsing_modules.append(parsing_module)
+            events.append(('finish', parsing_module))
+
+        results = []
+        with mock.patch.multiple(self.gatherfromsources, workers_count=3, max_workers_per_host=2, days_count=7), \
+                mock.patch.multiple(hosts_scheduler_class, next_parsing_modules=_next_parsing_modules, finish=_finish):
+            for parsing_module, parsing_result in self.gatherfromsources.Command()._parse_concurrently(parsing_modules):
+                self.assertEqual(parsing_module.source_name, parsing_result)
+                results.append(parsing_module)
+                # Slot freed by finished source is given to next source before result is saved
+                self.assertLess(events.index(('finish', parsing_module)), len(events) - 1 - events[::-1].index(('next', None)))
+        self.assertCountEqual(results, parsing_modules)
+        self.assertEqual(max(self.max_running_counts.values()), 2)
+
+
+class FeedDatetimeParsingTests(SimpleTestCase):
+
+    def test_parse_feed_datetime(self):
+        msk = datetime.timezone(datetime.timedelta(hours=3))
+        self.assertEqual(parse_feed_datetime('Пн, 02 мая 2022 10:00:00 +0300'), datetime.datetime(2022, 5, 2, 10, tzinfo=msk))
+        self.assertEqual(parse_feed_datetime('Mon, 2 May 2022 07:00:00 GMT'), datetime.datetime(2022, 5, 2, 10, tzinfo=msk))
+        self.assertEqual(parse_feed_datetime('2022-05-02T10:00:00.5+03:00'), datetime.datetime(2022, 5, 2, 10, 0, 0, 500000, tzinfo=msk))
+        self.assertEqual(parse_feed_datetime('2022-05-02T07:00:00Z'), datetime.datetime(2022, 5, 2, 10, tzinfo=msk))
+        # Not covered by fast paths
+        self.assertEqual(parse_feed_datetime('May 2, 2022 7:00 AM'), datetime.datetime(2022, 5, 2, 7, tzinfo=datetime.timezone.utc))
+
+    def test_is_fast_parseable(self):
+        self.assertTrue(is_fast_parseable('Пн, 02 мая 2022 10:00:00 +0300'))
+        self.assertTrue(is_fast_parseable('2022-05-02T07:00:00Z'))
+        self.assertFalse(is_fast_parseable('May 2, 2022 7:00 AM'))
+        self.assertFalse(is_fast_parseable('Mon, 31 Feb 2022 10:00:00 +0000'))
+
+
+class KeywordsIndexTests(TestCase):
+
+    def test_invalidation_on_keyword_changes(self):
+        keyword = Keyword.objects.create(**RandomKeywordGenerator.generate())
+        self.assertEqual(keywords_index().by_name['Linux'], [keyword])
+        self.assertEqual(keywords_index().matcher.find('Linux 6.0 released'), ['Linux'])
+        keyword.name = 'BSD'
+        keyword.save()
+        self.assertNotIn('Linux', keywords_index().by_name)
+        self.assertEqual(keywords_index().matcher.find('FreeBSD and BSD news'), ['BSD'])
+        keyword.delete()
+        self.assertEqual(keywords_index().keywords, [])
+
+
+class KeywordsRetaggingTests(TestCase):
+
+    def test_save_title_keywords_diff(self):
+        linux = Keyword.objects.create(name='Linux')
+        bsd = Keyword.objects.create(name='BSD')
+        kde = Keyword.objects.create(name='KDE')
+        digest_records = [DigestRecord.objects.create(title=title, url=f'https://example.com/{title_i}')
+                          for title_i, title in enumerate(('Linux and BSD news', 'KDE release', 'Nothing here'))]
+        digest_records[0].title_keywords.set([kde])
+        digest_records[1].title_keywords.set([kde])
+        changes = []
+        for chunk in iterate_digest_records_chunks(DigestRecord.objects.all(), chunk_size=2):
+            changes += save_title_keywords_diff({digest_record_id: keywords_ids
+                                                 for (digest_record_id, _), keywords_ids in zip(chunk, match_titles([title for _, title in chunk]))})
+        self.assertEqual(changes, [(digest_records[0].id, {linux.id, bsd.id}, {kde.id})])
+        self.assertEqual(set(digest_records[0].title_keywords.all()), {linux, bsd})
+        self.assertEqual(list(digest_records[1].title_keywords.all()), [kde])
+        self.assertEqual(list(digest_records[2].title_keywords.all()), [])
+
+    def test_retag_queued_keywords(self):
+        linux_record = DigestRecord.objects.create(title='Linux 6.0 released', url='https://example.com/linux')
+        bsd_record = DigestRecord.objects.create(title='FreeBSD 14 and BSD news', url='https://example.com/bsd')
+        keyword = Keyword.objects.create(name='Linux')
+        # Records are not retagged while keyword is saved
+        self.assertEqual(list(linux_record.title_keywords.all()), [])
+        self.assertEqual(retag_queued_keywords(), {keyword.id: 1})
+        self.assertEqual(list(linux_record.title_keywords.all()), [keyword])
+        keyword.name = 'BSD'
+        keyword.save()
+        keyword.save()
+        self.assertEqual(KeywordRetaggingQueueItem.objects.count(), 2)
+        self.assertEqual(retag_queued_keywords(), {keyword.id: 2})
+        self.assertEqual(list(linux_record.title_keywords.all()), [])
+        self.assertEqual(list(bsd_record.title_keywords.all()), [keyword])
+        self.assertEqual(retag_queued_keywords(), {})
+        self.assertEqual(retag_keyword_digest_records(keyword), 0)
+
+
+class DigestRecordsDatesTests(TestCase):
+
+    def test_backfill_digest_records_dates(self):
+        dt = datetime.datetime(2022, 5, 2, 10, 0, tzinfo=datetime.timezone.utc)
+        other_dt = datetime.datetime(2022, 5, 3, 10, 0, tzinfo=datetime.timezone.utc)
+        without_dt = DigestRecord.objects.create(title='Without date', url='https://example.com/1')
+        with_dt = DigestRecord.objects.create(title='With date', url='https://example.com/2', dt=other_dt)
+        with self.assertNumQueries(2):
+            urls = backfill_digest_records_dates({without_dt.url: dt,
+                                                  with_dt.url: dt,
+                                                  'https://example.com/3': dt})
+        self.assertEqual(urls, [without_dt.url])
+        without_dt.refresh_from_db()
+        with_dt.refresh_from_db()
+        self.assertEqual(without_dt.dt, dt)
+        self.assertEqual(with_dt.dt, other_dt)
+        with self.assertNumQueries(1):
+            self.assertEqual(backfill_digest_records_dates({without_dt.url: other_dt}), [])
+
+
+class GatheringScheduleTests(TestCase):
+
+    def test_polling_interval(self):
+        two_weeks = datetime.timedelta(days=14)
+        self.assertEqual(polling_interval(14, two_weeks, 0), datetime.timedelta(days=1))
+        self.assertEqual(polling_interval(28, two_weeks, 0), datetime.timedelta(hours=12))
+        self.assertEqual(polling_interval(100000, two_weeks, 0), MIN_POLLING_INTERVAL)
+        self.assertEqual(polling_interval(0, two_weeks, 0), MAX_POLLING_INTERVAL)
+        self.assertEqual(polling_interval(28, two_weeks, 1), datetime.timedelta(days=1))
+        self.assertEqual(polling_interval(100000, two_weeks, 2), MIN_POLLING_INTERVAL * 4)
+
+    def test_sources_due(self):
+        dt_now = datetime.datetime.now(tz=datetime.timezone.utc)
+        busy_source = DigestRecordsSource.objects.create(name='Busy', enabled=True)
+        quiet_source = DigestRecordsSource.objects.create(name='Quiet', enabled=True)
+        failing_source = DigestRecordsSource.objects.create(name='Failing', enabled=True)
+        new_source = DigestRecordsSource.objects.create(name='New', enabled=True)
+        for hours_ago in range(1, 48):
+            dt = dt_now - datetime.timedelta(hours=hours_ago)
+            DigestGatheringIteration.objects.create(dt=dt, gathered_count=10, saved_count=10, source=busy_source)
+            DigestGatheringIteration.objects.create(dt=dt, gathered_count=0, saved_count=0, source=quiet_source)
+            DigestGatheringIteration.objects.create(dt=dt, gathered_count=0, saved_count=0, source=failing_source,
+                                                    source_error='Timeout' if hours_ago < 5 else None)
+        self.assertEqual(sources_due([busy_source, quiet_source, failing_source, new_source], dt_now),
+                         [busy_source, new_source])
@@ -1,5 +1,4 @@
 import datetime
-import re
 
 from rest_framework.decorators import action
 from rest_framework import (
@@ -9,6 +8,7 @@ from rest_framework import (
 )
 
 import fngs.pagination
+from django.http import StreamingHttpResponse
 from gatherer.serializers import *
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
@@ -16,6 +16,13 @@ from django_filters.rest_framework import DjangoFilterBackend
 from gatherer.filters import *
 from common.permissions import *
 from gatherer.mixins import *
+from gatherer.keywordsmatcher import KeywordsMatcher
+from gatherer.keywordsindex import keywords_index
+from gatherer.export import (
+    csv_lines,
+    digest_records_export_rows,
+    ndjson_lines,
+)
 from tbot.models import *
 
 
@@ -23,6 +30,7 @@ class DigestRecordViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAdminUser]
     queryset = DigestRecord.objects.all().order_by('dt')
     serializer_class = DigestRecordSerializer
+    cursor_pagination_field = 'dt'
 
     @action(detail=False, methods=['get'], url_path='detailed')
     def detailed_list(self, request, *args, **kwargs):
@@ -30,6 +38,7 @@ class DigestRecordViewSet(viewsets.ModelViewSet):
         digest_issue = request.query_params.get('digest_issue', None)
         if digest_issue is not None:
             queryset = queryset.filter(digest_issue=digest_issue)
+        queryset = DigestRecordDetailedSerializer.setup_eager_loading(queryset)
         data = DigestRecordDetailedSerializer(self.paginate_queryset(queryset), many=True).data
         return self.get_paginated_response(data)
 
@@ -54,12 +63,31 @@ class DigestRecordViewSet(viewsets.ModelViewSet):
         data = DigestRecordWithSimilarSerializer(self.paginate_queryset(queryset), many=True).data
         return self.get_paginated_response(data)
 
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ('ndjson', 'csv'):
+            return Response({'error': f'Unknown output "{output}", expected "ndjson" or "csv"'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        filterset = DigestRecordsExportFilter(request.query_params, queryset=DigestRecord.objects.all())
+        if not filterset.is_valid():
+            return Response({'error': filterset.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        rows = digest_records_export_rows(filterset.qs)
+        if output == 'csv':
+            response = StreamingHttpResponse(csv_lines(rows), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(ndjson_lines(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="digest-records.{output}"'
+        return response
+
 
 # TODO: Obsolete, remove with removal of api/v1
 class DetailedDigestRecordViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAdminUser]
-    queryset = DigestRecord.objects.all().order_by('dt')
+    queryset = DigestRecordDetailedSerializer.setup_eager_loading(DigestRecord.objects.all().order_by('dt'))
     serializer_class = DigestRecordDetailedSerializer
+    cursor_pagination_field = 'dt'
     model = DigestRecord
     filter_class = SpecificDigestRecordsFilter
     filter_backends = [DjangoFilterBackend]
@@ -81,7 +109,7 @@ class NewFossNewsDigestRecordViewSet(GenericViewSet,
 
     def get_queryset(self):
         queryset = self.not_categorized_records_queryset(from_bot=False)
-        return queryset
+        return DigestRecordDetailedSerializer.setup_eager_loading(queryset)
 
 
 class NotCategorizedDigestRecordViewSet(GenericViewSet,
@@ -107,9 +135,9 @@ class OneNewFossNewsDigestRecordViewSet(GenericViewSet,
 
     def get_queryset(self):
         queryset = self.not_categorized_records_queryset(from_bot=False)
-        queryset = queryset.order_by('dt')
-        if queryset:
-            return [queryset[0]]
+        digest_record = queryset.order_by('dt').first()
+        if digest_record is not None:
+            return [digest_record]
         else:
             return []
 
@@ -131,9 +159,8 @@ class OldestNotCategorizedDigestRecordViewSet(GenericViewSet,
             return Response({'error': 'Missing "from-bot" option'}, status=status.HTTP_400_BAD_REQUEST)
         from_bot = False if from_bot.lower() == 'false' else True
         queryset = self.not_categorized_records_queryset(from_bot, project_name)
-        queryset = queryset.order_by('dt')
-        if queryset:
-            digest_record = queryset[0]
+        digest_record = queryset.order_by('dt').first()
+        if digest_record is not None:
             return Response({
                                 'results': [DigestRecordDetailedSerializer(digest_record).data],
                                 'links': {
@@ -160,9 +187,9 @@ class OneNewFossNewsDigestRecordFromTbotViewSet(GenericViewSet,
 
     def get_queryset(self):
         queryset = self.not_categorized_records_queryset(from_bot=True)
-        queryset = queryset.order_by('dt')
-        if queryset:
-            return [queryset[0]]
+        digest_record = queryset.order_by('dt').first()
+        if digest_record is not None:
+            return [digest_record]
         else:
             return []
 
@@ -202,7 +229,8 @@ class SpecificDigestRecordsViewSet(GenericViewSet, mixins.ListModelMixin):
     permission_classes = [permissions.IsAdminUser]
     model = DigestRecord
     serializer_class = DigestRecordDetailedSerializer
-    queryset = DigestRecord.objects.all()
+    queryset = DigestRecordDetailedSerializer.setup_eager_loading(DigestRecord.objects.all())
+    cursor_pagination_field = 'dt'
     filter_class = SpecificDigestRecordsFilter
     filter_backends = [DjangoFilterBackend]
 
@@ -288,16 +316,31 @@ class GuessContentCategoryView(mixins.ListModelMixin, GenericViewSet):
 
     def list(self, request, *args, **kwargs):
         title = request.query_params.get('title', None)
-        keywords = Keyword.objects.all()
+        index = keywords_index()
+        matched_keywords_names = set(index.matcher.find(title))
         matched_keywords_by_content_category = {}
-        for keyword in keywords:
-            if re.search(rf'\b{re.escape(keyword.name)}\b', title, re.IGNORECASE):
+        for keyword in index.keywords:
+            if keyword.name in matched_keywords_names:
                 if keyword.content_category not in matched_keywords_by_content_category:
                     matched_keywords_by_content_category[keyword.content_category] = []
                 matched_keywords_by_content_category[keyword.content_category].append(keyword.name)
         return Response({'title': title, 'matches': matched_keywords_by_content_category}, status=status.HTTP_200_OK)
 
 
+def records_matching_keywords(records, keywords):
+    keywords_matcher = KeywordsMatcher(keywords)
+    records_with_matched_keywords = [(record, set(keywords_matcher.find(record.title))) for record in records]
+    # Keep ordering by requested keywords first, then by records
+    matching_records = []
+    matching_records_ids = set()
+    for keyword in keywords:
+        for record, matched_keywords in records_with_matched_keywords:
+            if keyword in matched_keywords and record.pk not in matching_records_ids:
+                matching_records.append(record)
+                matching_records_ids.add(record.pk)
+    return matching_records
+
+
 class SimilarRecordsInPreviousNonSpecialDigest(mixins.ListModelMixin, GenericViewSet):
     permission_classes = [permissions.IsAdminUser | TelegramBotReadOnlyPermission]
 
@@ -319,23 +362,20 @@ class SimilarRecordsInPreviousNonSpecialDigest(mixins.ListModelMixin, GenericVie
                             status=status.HTTP_400_BAD_REQUEST)
         keywords = keywords_str.split(',')
 
-        similar_records_in_previous_digest = []
-        for keyword in keywords:
-            i = digest_number
-            while True:
-                previous_digest_issues = DigestIssue.objects.filter(number=i - 1)
-                if not previous_digest_issues:
-                    return DigestRecordsSource({'error': 'bad digest number'},
-                                               status=status.HTTP_400_BAD_REQUEST)
-                previous_digest_issue = previous_digest_issues[0]
-                if not previous_digest_issue.is_special:
-                    break
-                else:
-                    i -= 1
-            records = DigestRecord.objects.filter(digest_issue=previous_digest_issue, state='IN_DIGEST')
-            for record in records:
-                if re.search(rf'\b{re.escape(keyword)}\b', record.title, re.IGNORECASE) and record not in similar_records_in_previous_digest:
-                    similar_records_in_previous_digest.append(record)
+        i = digest_number
+        while True:
+            previous_digest_issues = DigestIssue.objects.filter(number=i - 1)
+            if not previous_digest_issues:
+                return Response({'error': 'bad digest number'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            previous_digest_issue = previous_digest_issues[0]
+            if not previous_digest_issue.is_special:
+                break
+            else:
+                i -= 1
+        records = DigestRecord.objects.filter(digest_issue=previous_digest_issue, state='IN_DIGEST')
+        similar_records_in_previous_digest = records_matching_keywords(records, keywords)
+        DigestRecordDetailedSerializer.eager_load_objects(similar_records_in_previous_digest)
         similar_records_in_previous_digest_titles = [DigestRecordDetailedSerializer(r).data
                                                      for r in similar_records_in_previous_digest]
 
@@ -363,12 +403,9 @@ class SimilarRecordsInPreviousDigest(mixins.ListModelMixin, GenericViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
         keywords = keywords_str.split(',')
 
-        similar_records_in_previous_digest = []
-        for keyword in keywords:
-            records = DigestRecord.objects.filter(digest_issue__number=current_digest_number - 1, state='IN_DIGEST')
-            for record in records:
-                if re.search(rf'\b{re.escape(keyword)}\b', record.title, re.IGNORECASE) and record not in similar_records_in_previous_digest:
-                    similar_records_in_previous_digest.append(record)
+        records = DigestRecord.objects.filter(digest_issue__number=current_digest_number - 1, state='IN_DIGEST')
+        similar_records_in_previous_digest = records_matching_keywords(records, keywords)
+        DigestRecordDetailedSerializer.eager_load_objects(similar_records_in_previous_digest)
         similar_records_in_previous_digest_titles = [DigestRecordDetailedSerializer(r).data
                                                      for r in similar_records_in_previous_digest]
 
@@ -0,0 +1,85 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:29
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('gatherer', '0094_digest_record_title_trigram_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestRecordSearchVector',
+            fields=[
+                ('digest_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_vector', serialize=False, to='gatherer.digestrecord')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(verbose_name='Search vector')),
+            ],
+            options={
+                'verbose_name': 'Digest record search vector',
+                'verbose_name_plural': 'Digest records search vectors',
+            },
+        ),
+        # Dictionary is chosen by record language, records with unknown language are indexed without stemming.
+        # Text is truncated to keep vectors size reasonable, tags of HTML are skipped by parser
+        migrations.RunSQL(
+            [
+                """
+                CREATE FUNCTION search_digest_record_search_vector(text, text, text, text) RETURNS tsvector
+                LANGUAGE sql STABLE AS $$
+                    SELECT setweight(to_tsvector(config, coalesce($1, '')), 'A')
+                           || setweight(to_tsvector(config, coalesce($2, '')), 'B')
+                           || setweight(to_tsvector(config, left(coalesce($3, ''), 100000)), 'C')
+                    FROM (SELECT (CASE $4 WHEN 'ENGLISH' THEN 'english' WHEN 'RUSSIAN' THEN 'russian' ELSE 'simple' END)::regconfig AS config) AS configs
+                $$;
+                """,
+                """
+                CREATE FUNCTION search_digest_record_search_vector_update() RETURNS trigger
+                LANGUAGE plpgsql AS $$
+                BEGIN
+                    INSERT INTO search_digestrecordsearchvector (digest_record_id, search_vector)
+                    VALUES (NEW.id, search_digest_record_search_vector(NEW.title, NEW.cleared_description, NEW.text, NEW.language))
+                    ON CONFLICT (digest_record_id) DO UPDATE SET search_vector = EXCLUDED.search_vector;
+                    RETURN NULL;
+                END
+                $$;
+                """,
+                """
+                CREATE TRIGGER search_digest_record_search_vector_insert
+                AFTER INSERT ON gatherer_digestrecord
+                FOR EACH ROW EXECUTE PROCEDURE search_digest_record_search_vector_update();
+                """,
+                """
+                CREATE TRIGGER search_digest_record_search_vector_update
+                AFTER UPDATE OF title, cleared_description, text, language ON gatherer_digestrecord
+                FOR EACH ROW
+                WHEN (OLD.title IS DISTINCT FROM NEW.title
+                      OR OLD.cleared_description IS DISTINCT FROM NEW.cleared_description
+                      OR OLD.text IS DISTINCT FROM NEW.text
+                      OR OLD.language IS DISTINCT FROM NEW.language)
+                EXECUTE PROCEDURE search_digest_record_search_vector_update();
+                """,
+                """
+                INSERT INTO search_digestrecordsearchvector (digest_record_id, search_vector)
+                SELECT id, search_digest_record_search_vector(title, cleared_description, text, language)
+                FROM gatherer_digestrecord;
+                """,
+                """
+                CREATE INDEX search_digestrecordsearchvector_search_vector_idx
+                ON search_digestrecordsearchvector USING gin (search_vector);
+                """,
+            ],
+            [
+                'DROP INDEX search_digestrecordsearchvector_search_vector_idx;',
+                'DROP TRIGGER search_digest_record_search_vector_update ON gatherer_digestrecord;',
+                'DROP TRIGGER search_digest_record_search_vector_insert ON gatherer_digestrecord;',
+                'DROP FUNCTION search_digest_record_search_vector_update();',
+                'DROP FUNCTION search_digest_record_search_vector(text, text, text, text);',
+            ],
+        ),
+    ]
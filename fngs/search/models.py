@@ -1,3 +1,17 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
-# Create your models here.
+from gatherer.models import DigestRecord
+
+
+class DigestRecordSearchVector(models.Model):
+    # Maintained by database trigger on digest records changes, see migrations
+    digest_record = models.OneToOneField(to=DigestRecord,
+                                         on_delete=models.CASCADE,
+                                         primary_key=True,
+                                         related_name='search_vector')
+    search_vector = SearchVectorField(verbose_name='Search vector')
+
+    class Meta:
+        verbose_name = 'Digest record search vector'
+        verbose_name_plural = 'Digest records search vectors'
@@ -1,3 +1,37 @@
+import unittest
+
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from gatherer.models import DigestRecord
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Full text search requires PostgreSQL')
+class SearchResultsViewTests(TestCase):
+
+    def setUp(self):
+        self.linux_record = DigestRecord.objects.create(title='Linux 6.0 released',
+                                                        url='https://example.com/news/linux-6-0',
+                                                        language='ENGLISH')
+        self.bsd_record = DigestRecord.objects.create(title='FreeBSD 14 released',
+                                                      url='https://example.org/freebsd-14',
+                                                      language='ENGLISH')
+
+    def search(self, query):
+        response = self.client.get(reverse('search_results'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['object_list'])
+
+    def test_full_text_search(self):
+        self.assertEqual(self.search('linux release'), [self.linux_record])
+
+    def test_url_search(self):
+        self.assertEqual(self.search('https://example.org/freebsd-14'), [self.bsd_record])
+        self.assertEqual(self.search('example.com/news'), [self.linux_record])
+        self.assertEqual(self.search('https://example.net/'), [])
 
-# Create your tests here.
+    def test_url_matches_first(self):
+        other_record = DigestRecord.objects.create(title='Release notes of example.org', url='https://example.net/notes',
+                                                   language='ENGLISH')
+        self.assertEqual(self.search('example.org'), [self.bsd_record, other_record])
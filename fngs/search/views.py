@@ -1,9 +1,26 @@
 from django.shortcuts import render
 
 from django.views.generic import TemplateView, ListView
-from django.db.models import Q
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.db.models import (
+    BooleanField,
+    ExpressionWrapper,
+    F,
+    Q,
+    Value,
+)
 
 from gatherer.models import DigestRecord
+from search.models import DigestRecordSearchVector
+
+
+# Records vectors are built with dictionary of their language or without stemming if language is unknown,
+# so query is parsed with all of these dictionaries
+SEARCH_CONFIGS = ('english', 'russian', 'simple')
+SEARCH_RESULTS_PAGE_SIZE = 50
 
 
 class SearchView(TemplateView):
@@ -13,13 +30,29 @@ class SearchView(TemplateView):
 class SearchResultsView(ListView):
     model = DigestRecord
     template_name = 'search_results.html'
+    paginate_by = SEARCH_RESULTS_PAGE_SIZE
 
     def get_queryset(self):
         query = self.request.GET.get('q')
-        filtered_objects = DigestRecord.objects.filter(
-            Q(title__icontains=query) | Q(url__icontains=query)
-        )
-        ordered_filtered_objects = filtered_objects.order_by('-dt')
+        if not query:
+            return DigestRecord.objects.none()
+        search_query = None
+        for config in SEARCH_CONFIGS:
+            config_search_query = SearchQuery(query, config=config, search_type='websearch')
+            search_query = config_search_query if search_query is None else search_query | config_search_query
+        matched_ids = DigestRecordSearchVector.objects.filter(search_vector=search_query).values('digest_record_id')
+        # URLs have no spaces, pasted links and their parts are found with trigram index of URLs
+        if not any(c.isspace() for c in query):
+            matched_ids = matched_ids.union(DigestRecord.objects.filter(url__icontains=query).values('id'))
+            url_matched = ExpressionWrapper(Q(url__icontains=query), output_field=BooleanField())
+        else:
+            url_matched = Value(False, output_field=BooleanField())
+        filtered_objects = DigestRecord.objects.filter(id__in=matched_ids) \
+                                               .defer('description', 'cleared_description', 'text')
+        ranked_filtered_objects = filtered_objects.annotate(url_matched=url_matched,
+                                                            rank=SearchRank(F('search_vector__search_vector'), search_query))
+        ordered_filtered_objects = ranked_filtered_objects.order_by('-url_matched', F('rank').desc(nulls_last=True),
+                                                                    F('dt').desc(nulls_last=True), '-id')
         return ordered_filtered_objects
 
     def get_context_data(self, *, object_list=None, **kwargs):
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.20 on 2026-10-18 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tbot', '0018_changed_default_estimated_is_main_to_none'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='telegrambotdigestrecordcategorizationattempt',
+            index=models.Index(fields=['digest_record', 'dt'], name='tbot_telegr_digest__da82b7_idx'),
+        ),
+    ]
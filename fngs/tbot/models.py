@@ -73,5 +73,8 @@ class TelegramBotDigestRecordCategorizationAttempt(models.Model):
                                                   blank=True)
 
     class Meta:
+        indexes = [
+            models.Index(fields=['digest_record', 'dt']),
+        ]
         verbose_name = 'Telegram Bot Digest Record Categorization Attempt'
         verbose_name_plural = 'Telegram Bot Digest Record Categorization Attempts'
@@ -1,6 +1,11 @@
 import random
 
 from rest_framework.decorators import action
+from django.db.models import (
+    Count,
+    Exists,
+    OuterRef,
+)
 from django.forms.models import model_to_dict
 from rest_framework import (
     viewsets,
@@ -80,26 +85,26 @@ class NotCategorizedFossNewsDigestRecordsMixin:
 
     def not_categorized_records(self, tbot_user_id, project_name='FOSS News'):
         if tbot_user_id is None:
-            return []
-        try:
-            tbot_user = TelegramBotUser.objects.get(pk=tbot_user_id)
-        except TelegramBotUser.DoesNotExist:
-            return []
-        categorized_by_this_user_digest_records_attempts = TelegramBotDigestRecordCategorizationAttempt.objects.filter(telegram_bot_user=tbot_user)
-        not_categorized_by_this_user_digest_records = DigestRecord.objects.filter(state='UNKNOWN',
-                                                                                  projects__in=(Project.objects.filter(name=project_name))).exclude(pk__in=[a.digest_record.pk for a in categorized_by_this_user_digest_records_attempts]).order_by('-dt')
-        attempts_for_not_categorized_records = TelegramBotDigestRecordCategorizationAttempt.objects.filter(digest_record__in=not_categorized_by_this_user_digest_records)
-        attempts_per_digest_record = {}
-        for attempt in attempts_for_not_categorized_records:
-            if attempt.digest_record.id in attempts_per_digest_record:
-                attempts_per_digest_record[attempt.digest_record.id] += 1
-            else:
-                attempts_per_digest_record[attempt.digest_record.id] = 1
-        digest_records_with_enough_attempts = [drid
-                                               for drid, attempts in attempts_per_digest_record.items()
-                                               if attempts >= self.ENOUGH_TBOT_USERS_DIGEST_RECORD_ESTIMATIONS]
-        not_categorized_by_this_user_digest_records_but_still_actual = not_categorized_by_this_user_digest_records.exclude(pk__in=digest_records_with_enough_attempts)
-        return not_categorized_by_this_user_digest_records_but_still_actual
+            return DigestRecord.objects.none()
+        if not TelegramBotUser.objects.filter(pk=tbot_user_id).exists():
+            return DigestRecord.objects.none()
+        in_project = Exists(DigestRecord.projects.through.objects.filter(digestrecord_id=OuterRef('pk'),
+                                                                         project__name=project_name))
+        categorized_by_this_user = Exists(TelegramBotDigestRecordCategorizationAttempt.objects.filter(digest_record_id=OuterRef('pk'),
+                                                                                                      telegram_bot_user_id=tbot_user_id))
+        return (DigestRecord.objects.filter(in_project, ~categorized_by_this_user, state='UNKNOWN')
+                                    .annotate(tbot_estimations_count=Count('tbot_estimations'))
+                                    .filter(tbot_estimations_count__lt=self.ENOUGH_TBOT_USERS_DIGEST_RECORD_ESTIMATIONS)
+                                    .order_by('-dt'))
+
+    def random_not_categorized_record(self, tbot_user_id, project_name='FOSS News'):
+        not_categorized_records = self.not_categorized_records(tbot_user_id, project_name)
+        count = not_categorized_records.count()
+        if not count:
+            return None
+        offset = random.randrange(count)
+        # Records could be categorized between queries, so do not rely on offset existence
+        return not_categorized_records[offset:offset + 1].first()
 
 
 # TODO: Obsolete, remove with removal of api/v1
@@ -112,9 +117,8 @@ class TelegramBotOneRandomNotCategorizedFossNewsDigestRecordViewSet(mixins.ListM
 
     def get_queryset(self):
         tbot_user_id = self.request.query_params.get('tbot-user-id', None)
-        not_categorized_by_this_user_digest_records_but_still_actual = self.not_categorized_records(tbot_user_id)
-        if not_categorized_by_this_user_digest_records_but_still_actual:
-            random_record = random.choice(not_categorized_by_this_user_digest_records_but_still_actual)
+        random_record = self.random_not_categorized_record(tbot_user_id)
+        if random_record is not None:
             return [random_record]
         else:
             return []
@@ -134,10 +138,8 @@ class TelegramBotOneRandomNotCategorizedDigestRecordViewSet(mixins.ListModelMixi
         project_name = self.request.query_params.get('project', None)
         if not project_name:
             return Response({'error': 'Empty "project_name" parameter'}, status=status.HTTP_400_BAD_REQUEST)
-        not_categorized_by_this_user_digest_records_but_still_actual = self.not_categorized_records(tbot_user_id,
-                                                                                                    project_name)
-        if not_categorized_by_this_user_digest_records_but_still_actual:
-            random_record = random.choice(not_categorized_by_this_user_digest_records_but_still_actual)
+        random_record = self.random_not_categorized_record(tbot_user_id, project_name)
+        if random_record is not None:
             return Response({'results': [DigestRecordDetailedSerializer(random_record).data]}, status=status.HTTP_200_OK)
         else:
             return Response({'results': []}, status=status.HTTP_200_OK)
@@ -151,9 +153,9 @@ class TelegramBotNotCategorizedFossNewsDigestRecordsCountViewSet(mixins.ListMode
 
     def list(self, request, *args, **kwargs):
         tbot_user_id = request.query_params.get('tbot-user-id', None)
-        not_categorized_by_this_user_digest_records_but_still_actual = self.not_categorized_records(tbot_user_id)
-        if not_categorized_by_this_user_digest_records_but_still_actual:
-            return Response({'count': not_categorized_by_this_user_digest_records_but_still_actual.count()}, status=status.HTTP_200_OK)
+        count = self.not_categorized_records(tbot_user_id).count()
+        if count:
+            return Response({'count': count}, status=status.HTTP_200_OK)
         else:
             return Response(None, status=status.HTTP_200_OK)
 
@@ -170,10 +172,9 @@ class TelegramBotNotCategorizedDigestRecordsCountViewSet(mixins.ListModelMixin,
         project_name = self.request.query_params.get('project', None)
         if not project_name:
             return Response({'error': 'Empty "project_name" parameter'}, status=status.HTTP_400_BAD_REQUEST)
-        not_categorized_by_this_user_digest_records_but_still_actual = self.not_categorized_records(tbot_user_id,
-                                                                                                    project_name)
-        if not_categorized_by_this_user_digest_records_but_still_actual:
-            return Response({'count': not_categorized_by_this_user_digest_records_but_still_actual.count()}, status=status.HTTP_200_OK)
+        count = self.not_categorized_records(tbot_user_id, project_name).count()
+        if count:
+            return Response({'count': count}, status=status.HTTP_200_OK)
         else:
             return Response(None, status=status.HTTP_200_OK)
 
@@ -202,25 +203,34 @@ class DigestRecordsCategorizedByTbotViewSet(mixins.ListModelMixin,
                                             NotCategorizedDigestRecordsMixin):
     permission_classes = [permissions.IsAdminUser]
 
-    def list(self, request, *args, **kwargs):
-        not_fully_categorized_digest_records = self.not_categorized_records_queryset(from_bot=True)
-        tbot_categorizations_attempts_for_unknown_records = TelegramBotDigestRecordCategorizationAttempt.objects.filter(digest_record__in=not_fully_categorized_digest_records)
-        categorizations_data_by_digest_record = {}
-        categorization_attempt: TelegramBotDigestRecordCategorizationAttempt
-        for categorization_attempt in tbot_categorizations_attempts_for_unknown_records:
-            digest_record_id = categorization_attempt.digest_record.id
-            if digest_record_id not in categorizations_data_by_digest_record:
-                categorizations_data_by_digest_record[digest_record_id] = {
-                    'record': DigestRecordDetailedSerializer(DigestRecord.objects.get(id=digest_record_id)).data,
-                    'estimations': [],
+    def get_queryset(self):
+        queryset = self.not_categorized_records_queryset(from_bot=True).order_by('id')
+        return DigestRecordDetailedSerializer.setup_eager_loading(queryset)
+
+    @staticmethod
+    def _categorization_data(digest_record: DigestRecord):
+        return {
+            'record': DigestRecordDetailedSerializer(digest_record).data,
+            'estimations': [
+                {
+                    'user': categorization_attempt.telegram_bot_user.username,
+                    'state': categorization_attempt.estimated_state,
+                    'is_main': categorization_attempt.estimated_is_main,
+                    'content_type': categorization_attempt.estimated_content_type,
+                    'content_category': categorization_attempt.estimated_content_category,
                 }
-            estimation_data = {
-                'user': categorization_attempt.telegram_bot_user.username,
-                'state': categorization_attempt.estimated_state,
-                'is_main': categorization_attempt.estimated_is_main,
-                'content_type': categorization_attempt.estimated_content_type,
-                'content_category': categorization_attempt.estimated_content_category,
-            }
-            categorizations_data_by_digest_record[digest_record_id]['estimations'].append(estimation_data)
+                for categorization_attempt in digest_record.tbot_estimations.all()
+            ],
+        }
+
+    def list(self, request, *args, **kwargs):
+        categorizations_data_by_digest_record = {digest_record.id: self._categorization_data(digest_record)
+                                                 for digest_record in self.get_queryset()}
         return Response(categorizations_data_by_digest_record,
                         status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='paginated')
+    def paginated_list(self, request, *args, **kwargs):
+        digest_records = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response([self._categorization_data(digest_record)
+                                            for digest_record in digest_records])